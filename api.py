@@ -1,11 +1,31 @@
-from flask import Flask, request, jsonify, make_response, url_for
-from get_recommendations import get_recommendations, prepare_output
-from calculate_diff import calculate_diff
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context, url_for
+from get_recommendations import get_ranked_recommendations, get_recommendations, prepare_output
+from plan_horizon import get_horizon_recommendations
+from calculate_diff import calculate_diff, what_if_batch
 from cors_handling import _build_cors_preflight_response, _corsify_actual_response
 from evaluate_diff import evaluate_diff
 from chat import chat
+from retrieval_helper.snapshot_store import snapshot_store
+from prewarm import start_background_prewarm
+from optimize.horizon import DEFAULT_CONTINUITY_WEIGHT
+from optimize.SoftConstraintHandler import resolve_weights
+from datetime import datetime
+import json
+import os
 app = Flask(__name__)
 
+# Upper bound for `k` of /ranked_recommendations, every further plan is another solve
+MAX_RANKED_PLANS = 10
+# Most forced pairs one /what_if_batch request may evaluate
+MAX_WHAT_IF_PAIRS = 200
+
+# Parse the data files once per worker so requests are served from memory
+snapshot_store.preload()
+
+# Optionally keep the cache warm for the upcoming planning days (PREWARM_CACHE=1)
+if os.getenv("PREWARM_CACHE") == "1":
+    start_background_prewarm()
+
 @app.route('/recommendations', methods=['POST', 'OPTIONS'])
 def recommendations():
     if request.method == 'OPTIONS':
@@ -15,22 +35,129 @@ def recommendations():
         
         unavailable_clients = data.get("unavailable_clients", None)
         unavailable_mas = data.get("unavailable_mas", None)
+        # Optional objective weights, e.g. {"travel_time": 60}; missing ones keep their defaults
+        weights = data.get("weights", None)
         
         print(jsonify(unavailable_clients))
         print(jsonify(unavailable_mas))
         
-        result = get_recommendations(unavailable_clients, unavailable_mas)
+        result = get_recommendations(unavailable_clients, unavailable_mas, weights=weights)
         prepared_result = prepare_output(result)
         print("result:")
         print(result)
         print("prepared_result:")
         print(prepared_result)
         
-        return _corsify_actual_response(jsonify(prepared_result))
+        response = jsonify(prepared_result)
+        # The body stays a plain list; the solve quality travels in headers
+        status = (result or {}).get("assignment_info", {}).get("solver_status")
+        if status is not None:
+            response.headers["X-Proven-Optimal"] = "true" if status["proven_optimal"] else "false"
+            response.headers["X-Optimality-Gap"] = str(status["optimality_gap"])
+            response.headers["X-Solver-Status"] = status["status"]
+            response.headers["Access-Control-Expose-Headers"] = "X-Proven-Optimal, X-Optimality-Gap, X-Solver-Status"
+        return _corsify_actual_response(response)
             
     except Exception as e:
         return _corsify_actual_response(jsonify({"error": str(e)}))
 
+@app.route('/ranked_recommendations', methods=['POST', 'OPTIONS'])
+def ranked_recommendations():
+    if request.method == 'OPTIONS':
+        return _build_cors_preflight_response()
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            k = int(data.get("k", 3))
+        except (TypeError, ValueError):
+            k = 0
+        if k < 1:
+            return _corsify_actual_response(
+                make_response(jsonify({"error": "'k' must be a positive integer"}), 400)
+            )
+        k = min(k, MAX_RANKED_PLANS)
+        unavailable_clients = data.get("unavailable_clients", None)
+        unavailable_mas = data.get("unavailable_mas", None)
+        weights = data.get("weights", None)
+        
+        result = get_ranked_recommendations(k, unavailable_clients, unavailable_mas, weights=weights)
+        if result is None:
+            return _corsify_actual_response(jsonify([]))
+        
+        prepared_result = [
+            {
+                "objective": plan["objective"],
+                "breakdown": plan["breakdown"],
+                # The ranking ends at the first plan that is not proven optimal
+                "solver_status": plan["assignment_info"]["solver_status"],
+                "recommendations": prepare_output(
+                    {"assignment_info": plan["assignment_info"], "mas": result["mas"], "clients": result["clients"]}
+                ),
+            }
+            for plan in result["plans"]
+        ]
+        return _corsify_actual_response(jsonify(prepared_result))
+    
+    except Exception as e:
+        return _corsify_actual_response(jsonify({"error": str(e)}))
+
+@app.route('/horizon_recommendations', methods=['POST', 'OPTIONS'])
+def horizon_recommendations():
+    if request.method == 'OPTIONS':
+        return _build_cors_preflight_response()
+    try:
+        data = request.get_json() or {}
+        
+        start = data.get("start", None)
+        end = data.get("end", None)
+        if start is None or end is None:
+            return _corsify_actual_response(jsonify({"error": "start and end are required"}))
+        unavailable_clients = data.get("unavailable_clients", None)
+        unavailable_mas = data.get("unavailable_mas", None)
+        weights = data.get("weights", None)
+        # "parallel", "sequential" or "joint", see optimize.horizon.solve_horizon
+        mode = data.get("mode", "joint")
+        try:
+            continuity_weight = int(data.get("continuity_weight", DEFAULT_CONTINUITY_WEIGHT))
+        except (TypeError, ValueError):
+            continuity_weight = -1
+        if continuity_weight < 0:
+            # A negative weight would penalise keeping the same MA instead of rewarding it
+            return _corsify_actual_response(
+                make_response(jsonify({"error": "'continuity_weight' must be a non-negative integer"}), 400)
+            )
+        
+        result = get_horizon_recommendations(
+            datetime.fromisoformat(start),
+            datetime.fromisoformat(end),
+            unavailable_clients,
+            unavailable_mas,
+            mode=mode,
+            continuity_weight=continuity_weight,
+            weights=weights,
+        )
+        if result is None:
+            return _corsify_actual_response(jsonify({"days": []}))
+        
+        prepared_result = {
+            "days": [
+                {
+                    "date": day["date"],
+                    "recommendations": prepare_output(day),
+                    "proven_optimal": day["assignment_info"]["solver_status"]["proven_optimal"],
+                }
+                for day in result["days"]
+            ],
+            "kept": result["kept"],
+            "objective": result["objective"],
+            "proven_optimal": result["solver_status"]["proven_optimal"],
+        }
+        return _corsify_actual_response(jsonify(prepared_result))
+    
+    except Exception as e:
+        return _corsify_actual_response(jsonify({"error": str(e)}))
+
 @app.route('/retrieve_diff', methods=['POST', 'OPTIONS'])
 def calculate_diff_endpoint():
     if request.method == 'OPTIONS':
@@ -52,6 +179,42 @@ def calculate_diff_endpoint():
     
     return _corsify_actual_response(jsonify(result))
 
+@app.route('/what_if_batch', methods=['POST', 'OPTIONS'])
+def what_if_batch_endpoint():
+    if request.method == 'OPTIONS':
+        return _build_cors_preflight_response()
+    
+    data = request.get_json() or {}
+    
+    pairs = data.get('pairs', None)
+    if (
+        not isinstance(pairs, list)
+        or not pairs
+        or any(not isinstance(pair, dict) or pair.get('ma') is None or pair.get('klient') is None for pair in pairs)
+    ):
+        return _corsify_actual_response(
+            make_response(jsonify({"error": "pairs must be a list of objects with ma and klient"}), 400)
+        )
+    if len(pairs) > MAX_WHAT_IF_PAIRS:
+        return _corsify_actual_response(
+            make_response(jsonify({"error": f"at most {MAX_WHAT_IF_PAIRS} pairs per batch"}), 400)
+        )
+    unavailable_clients = data.get('unavailable_clients', None)
+    unavailable_mas = data.get('unavailable_mas', None)
+    try:
+        # Validate before the stream starts, errors cannot be reported in its headers later
+        weights = resolve_weights(data.get('weights', None))
+    except ValueError as e:
+        return _corsify_actual_response(make_response(jsonify({"error": str(e)}), 400))
+    
+    def generate():
+        # One JSON document per line, sent as soon as a variant is solved
+        for variant in what_if_batch(pairs, unavailable_clients=unavailable_clients, unavailable_mas=unavailable_mas, weights=weights):
+            yield json.dumps(variant, default=str) + "\n"
+    
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    return _corsify_actual_response(response)
+
 @app.route("/api/v1/chat", methods=["POST", "OPTIONS"])
 def chat_completion():
     if request.method == "OPTIONS":
@@ -1,17 +1,20 @@
 from typing import List, Dict, Any, Tuple
 from retrieval_helper.read_file import read_file
-from id_handling.name_generator import load_name_mappings
+from id_handling.name_generator import name_registry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Iterator
 import statistics
 import json
 
-from get_recommendations import get_recommendations, get_mas_and_clients, prepare_output
+from get_recommendations import DEFAULT_DATE, get_recommendations, get_mas_and_clients, get_session, prepare_output
 from llm_formatting.assignment_simple import assignment_simple
 from llm_formatting.assignment_simple import assignments_to_markdown
 
 from utils.float_to_time import float_to_time
-from utils.stats_feature_mapping import feature_mapping_dr
+from utils.stats_feature_mapping import feature_mapping_dr, objective_mapping_dr
 
-name_mappings = load_name_mappings()
+name_mappings = name_registry.names
 
 PRIORITY_KEYS = ("hoch", "mittel", "niedrig")
 PRIORITY_TO_KEY = {1: "hoch", 2: "mittel", 3: "niedrig"}
@@ -40,6 +43,8 @@ def compute_basic_stats(values: List[float]) -> Dict[str, Any]:
         return {"durchschnitt": None, "max": None, "min": None}
     
     values = [v for v in values if v is not None]
+    if not values:
+        return {"durchschnitt": None, "max": None, "min": None}
     print(f"values: {values}")
     count = len(values)
     mean = statistics.mean(values)
@@ -120,8 +125,18 @@ def stats_for_field(field: str, items: List[Dict]) -> Dict[str, Any]:
     return compute_basic_stats(values)
 
 
+def objective_change(old_breakdown: Dict[str, int], new_breakdown: Dict[str, int]) -> Dict[str, int]:
+    """Change of every objective component between two plans; positive values are worse."""
+    change = {
+        description: new_breakdown[objective] - old_breakdown[objective]
+        for objective, description in objective_mapping_dr.items()
+    }
+    change["gesamt"] = sum(new_breakdown.values()) - sum(old_breakdown.values())
+    return change
+
+
 def analyze_added_removed(
-    old: List[Dict], new: List[Dict]
+    old: List[Dict], new: List[Dict], old_breakdown: Dict[str, int] = None, new_breakdown: Dict[str, int] = None
 ) -> Dict:
     old_map = {key_of(x): x for x in old}
     new_map = {key_of(x): x for x in new}
@@ -159,6 +174,10 @@ def analyze_added_removed(
             }
         stats[prio_key] = {"felder": felder}
 
+    if old_breakdown is not None and new_breakdown is not None:
+        # Taken from the solver's objective breakdown instead of re-deriving it from the features
+        stats["zielfunktion"] = objective_change(old_breakdown, new_breakdown)
+
     return {
         "stats": stats,
     }, added, removed
@@ -236,7 +255,14 @@ def calculate_diff(add_client: str, add_ma: str, unavailable_clients: List[str]
     mas_old, clients_old = get_mas_and_clients(results_old)
     mas_new, clients_new = get_mas_and_clients(results_new)
 
-    analysis_result, added, removed = analyze_added_removed(results_old["assignment_info"]["assigned_pairs"], results_new["assignment_info"]["assigned_pairs"])
+    old_info = results_old["assignment_info"]
+    new_info = results_new["assignment_info"]
+    analysis_result, added, removed = analyze_added_removed(
+        old_info["assigned_pairs"],
+        new_info["assigned_pairs"],
+        old_info.get("objective_breakdown"),
+        new_info.get("objective_breakdown"),
+    )
     
     print(f"analysis_result: {analysis_result}")
     
@@ -252,6 +278,88 @@ def calculate_diff(add_client: str, add_ma: str, unavailable_clients: List[str]
     return analysis_result, list(mas_new.keys())
 
 
+def what_if_batch(
+    pairs: List[Dict[str, str]],
+    unavailable_clients: List[str] = None,
+    unavailable_mas: List[str] = None,
+    date: datetime = None,
+    solver: str = "cpsat",
+    max_workers: int = 4,
+    weights: Dict[str, int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Evaluate many forced MA/client assignments against one baseline.
+
+    The day dataset is loaded and the model is built once; every variant is
+    then solved on that shared session, several at a time. Results are
+    yielded as soon as a variant finishes, so their order does not follow
+    `pairs` - use the `index` field to match them up.
+
+    Args:
+        pairs: Forced assignments as `{"ma": ..., "klient": ...}` dictionaries.
+        unavailable_clients: Client IDs to exclude from every variant.
+        unavailable_mas: MA IDs to exclude from every variant.
+        date: Planning date, defaults to the date used by `get_recommendations`.
+        solver: Solver backend, see `optimize.optimizer.SOLVERS`.
+        max_workers: Number of variants solved concurrently.
+        weights: Objective weights for the baseline and every variant.
+
+    Yields:
+        One dictionary per variant with the forced `ma` and `klient`, the new
+        `assigned_pairs`, the `analyze_added_removed` stats, the `added`
+        and `removed` pairs and the `solver_status` of the variant, or an
+        `error` if the variant has no solution or could not be evaluated.
+    """
+    if date is None:
+        date = DEFAULT_DATE
+    
+    baseline = get_recommendations(unavailable_clients, unavailable_mas, date=date, solver=solver, weights=weights)
+    if baseline is None:
+        yield {"error": "No feasible baseline solution found"}
+        return
+    baseline_pairs = baseline["assignment_info"]["assigned_pairs"]
+    baseline_breakdown = baseline["assignment_info"].get("objective_breakdown")
+    
+    # Build the shared model before the workers start asking for it
+    get_session(date, unavailable_clients, unavailable_mas, solver)
+    
+    def evaluate(index: int, pair: Dict[str, str]) -> Dict[str, Any]:
+        variant = {"index": index, "ma": pair.get("ma"), "klient": pair.get("klient")}
+        result = get_recommendations(
+            unavailable_clients,
+            unavailable_mas,
+            forced_ma=variant["ma"],
+            forced_client=variant["klient"],
+            date=date,
+            solver=solver,
+            weights=weights,
+        )
+        if result is None:
+            variant["error"] = "No feasible solution found"
+            return variant
+        
+        assigned_pairs = result["assignment_info"]["assigned_pairs"]
+        analysis_result, added, removed = analyze_added_removed(
+            baseline_pairs, assigned_pairs, baseline_breakdown, result["assignment_info"].get("objective_breakdown")
+        )
+        variant["assigned_pairs"] = assigned_pairs
+        variant["stats"] = analysis_result["stats"]
+        variant["added"] = added
+        variant["removed"] = removed
+        variant["solver_status"] = result["assignment_info"].get("solver_status")
+        return variant
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(evaluate, index, pair): (index, pair) for index, pair in enumerate(pairs)}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # The stream has already started, so a failed variant becomes an error record
+                index, pair = futures[future]
+                print(f"What-if variant {index} failed: {e}")
+                yield {"index": index, "ma": pair.get("ma"), "klient": pair.get("klient"), "error": str(e)}
+
+
 if __name__ == "__main__":
     
     # analysis_result, _ = calculate_diff(" dc4f6682-5418-4e69-b08e-eded0d66b060", "f3bf2472-89c6-4bd0-bd31-b092a48a89c3")
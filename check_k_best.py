@@ -0,0 +1,112 @@
+"""
+Check the k best plans of both solvers against brute force.
+
+On random instances small enough to enumerate every plan, with and without
+a forced pair, Murty's ranking (`k_best_assignments`) and the CP-SAT ranking
+(`k_best_cp`) must return k distinct feasible plans whose objectives equal
+the k smallest objectives of all plans.
+
+Run:   python check_k_best.py --trials 100
+Exits with status 1 if any instance disagrees.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import List, Tuple
+
+import numpy as np
+
+from check_marginal_costs import enumerate_plans, random_instance
+from optimize.k_best import k_best_assignments, k_best_cp
+
+
+def _plan_problems(
+    name: str,
+    plans: List[Tuple[List[Tuple[int, int]], int]],
+    expected: List[int],
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    forced_pair: Tuple[int, int] = None,
+) -> List[str]:
+    problems = []
+    objectives = [int(objective) for _, objective in plans]
+    if objectives != expected:
+        problems.append(f"{name}: objectives {objectives} != brute force {expected}")
+    if len({tuple(pairs) for pairs, _ in plans}) != len(plans):
+        problems.append(f"{name}: plans are not distinct")
+    for pairs, objective in plans:
+        clients = [j for _, j in pairs]
+        mas = [i for i, _ in pairs]
+        if len(set(clients)) != len(clients) or len(set(mas)) != len(mas):
+            problems.append(f"{name}: plan {pairs} assigns an MA or client twice")
+        if any(not eligible[pair] and pair != forced_pair for pair in pairs):
+            problems.append(f"{name}: plan {pairs} has an ineligible pair")
+        if forced_pair is not None and forced_pair not in pairs:
+            problems.append(f"{name}: plan {pairs} misses the forced pair {forced_pair}")
+        recomputed = int(unassigned_cost) * (cost_matrix.shape[1] - len(pairs)) + sum(
+            int(cost_matrix[pair]) for pair in pairs
+        )
+        if recomputed != int(objective):
+            problems.append(f"{name}: plan {pairs} reports {objective}, costs {recomputed}")
+    return problems
+
+
+def check_instance(
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    k: int,
+    forced_pair: Tuple[int, int] = None,
+) -> List[str]:
+    """Differences between both rankings and brute force, empty if they agree."""
+    expected = [objective for objective, _ in enumerate_plans(cost_matrix, eligible, unassigned_cost, forced_pair)[:k]]
+    murty = k_best_assignments(cost_matrix, eligible, unassigned_cost, k, forced_pair=forced_pair)
+    ranked = k_best_cp(cost_matrix, eligible, unassigned_cost, k, forced_pair=forced_pair)
+
+    problems = _plan_problems("Murty", murty, expected, cost_matrix, eligible, unassigned_cost, forced_pair)
+    problems += _plan_problems(
+        "CP-SAT",
+        [(pairs, objective) for pairs, objective, _ in ranked],
+        expected,
+        cost_matrix,
+        eligible,
+        unassigned_cost,
+        forced_pair,
+    )
+    if not all(status["proven_optimal"] for _, _, status in ranked):
+        problems.append("CP-SAT: a plan is not proven optimal")
+    return problems
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check the k best plans of both solvers against brute force.")
+    parser.add_argument("--trials", type=int, default=100, help="Number of random instances.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random instances.")
+    parser.add_argument("-k", type=int, default=6, help="Plans ranked per instance.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    failed = 0
+    for trial in range(args.trials):
+        cost_matrix, eligible, unassigned_cost = random_instance(rng, max_size=4)
+        # Every third instance forces a random pair, eligible or not
+        forced_pair = None
+        if trial % 3 == 0:
+            forced_pair = (int(rng.integers(cost_matrix.shape[0])), int(rng.integers(cost_matrix.shape[1])))
+        problems = check_instance(cost_matrix, eligible, unassigned_cost, args.k, forced_pair)
+        if problems:
+            failed += 1
+            print(f"Instance {trial}: " + "; ".join(problems))
+    print(f"{args.trials - failed} of {args.trials} instances agree with brute force")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Check the marginal costs of the alternatives against brute force.
+
+On random instances small enough to enumerate every plan, the objective
+increase that `marginal_costs` reports for forcing an MA/client pair must
+equal the best plan with that pair minus the best plan overall, and
+`top_k_alternatives` must list the k cheapest clients per MA.
+
+Run:   python check_marginal_costs.py --trials 300
+Exits with status 1 if any instance disagrees.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import List, Tuple
+
+import numpy as np
+
+from optimize.alternatives import marginal_costs, top_k_alternatives
+from optimize.assignment_solver import solve_assignment
+
+
+def enumerate_plans(
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    forced_pair: Tuple[int, int] = None,
+) -> List[Tuple[int, List[Tuple[int, int]]]]:
+    """Every feasible plan as `(objective, pairs)`, cheapest first; only for tiny instances.
+
+    A forced pair must be part of the plan and may be assigned even if it is
+    not eligible, like in the solvers.
+    """
+    n_mas, n_clients = cost_matrix.shape
+    plans = []
+
+    def extend(j: int, used: frozenset, pairs: List[Tuple[int, int]]) -> None:
+        if j == n_clients:
+            if forced_pair is None or forced_pair in pairs:
+                objective = int(unassigned_cost) * (n_clients - len(pairs)) + sum(int(cost_matrix[p]) for p in pairs)
+                plans.append((objective, sorted(pairs)))
+            return
+        # Client j stays unassigned or takes any free MA
+        extend(j + 1, used, pairs)
+        for i in range(n_mas):
+            if i not in used and (eligible[i, j] or (i, j) == forced_pair):
+                extend(j + 1, used | {i}, pairs + [(i, j)])
+
+    extend(0, frozenset(), [])
+    plans.sort()
+    return plans
+
+
+def random_instance(rng: np.random.Generator, max_size: int = 5) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Cost matrix, eligibility and unassigned cost of a random instance with ties."""
+    n_mas, n_clients = int(rng.integers(1, max_size + 1)), int(rng.integers(1, max_size + 1))
+    cost_matrix = rng.integers(-500, 1500, size=(n_mas, n_clients)) * 1000
+    # Equal costs make several plans optimal
+    cost_matrix[rng.random((n_mas, n_clients)) < 0.2] = 0
+    eligible = rng.random((n_mas, n_clients)) < 0.6
+    unassigned_cost = int(rng.integers(0, 2)) * 1_000_000
+    return cost_matrix, eligible, unassigned_cost
+
+
+def check_instance(cost_matrix: np.ndarray, eligible: np.ndarray, unassigned_cost: int, k: int) -> List[str]:
+    """Differences between the optimizer's alternatives and brute force, empty if they agree."""
+    problems = []
+    solution, objective = solve_assignment(cost_matrix, eligible, unassigned_cost)
+    optimum = enumerate_plans(cost_matrix, eligible, unassigned_cost)[0][0]
+    if objective != optimum:
+        problems.append(f"optimum {objective} != brute force {optimum}")
+
+    increase = marginal_costs(cost_matrix, eligible, unassigned_cost, solution)
+    assigned = set(solution)
+    expected = {}
+    for i, j in zip(*np.nonzero(eligible)):
+        pair = (int(i), int(j))
+        if pair in assigned:
+            continue
+        expected[pair] = enumerate_plans(cost_matrix, eligible, unassigned_cost, forced_pair=pair)[0][0] - optimum
+        if round(increase[pair]) != expected[pair]:
+            problems.append(f"pair {pair}: marginal cost {increase[pair]} != brute force {expected[pair]}")
+
+    alternatives = top_k_alternatives(cost_matrix, eligible, unassigned_cost, solution, k=k)
+    for i in range(cost_matrix.shape[0]):
+        cheapest = sorted(cost for (ma, _), cost in expected.items() if ma == i)[:k]
+        ranked = alternatives.get(i, [])
+        if [cost for _, cost in ranked] != cheapest:
+            problems.append(f"MA {i}: alternatives {ranked} are not the {k} cheapest {cheapest}")
+        for j, cost in ranked:
+            if expected.get((i, j)) != cost:
+                problems.append(f"MA {i}: alternative client {j} costs {expected.get((i, j))}, reported {cost}")
+    return problems
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check the marginal costs of the alternatives against brute force.")
+    parser.add_argument("--trials", type=int, default=300, help="Number of random instances.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random instances.")
+    parser.add_argument("-k", type=int, default=3, help="Alternatives per MA.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    failed = 0
+    for trial in range(args.trials):
+        problems = check_instance(*random_instance(rng), k=args.k)
+        if problems:
+            failed += 1
+            print(f"Instance {trial}: " + "; ".join(problems))
+    print(f"{args.trials - failed} of {args.trials} instances agree with brute force")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
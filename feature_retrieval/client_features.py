@@ -2,6 +2,8 @@ from typing import List
 from datetime import datetime
 import pandas as pd
 
+from feature_retrieval.qualifications import qualification_registry
+
 weekDaysMapping = ("montag", "dienstag", 
                    "mittwoch", "donnerstag",
                    "freitag", "samstag", "sonntag")
@@ -30,14 +32,9 @@ def aggregate_client_features(open_client_objects: List, date: datetime):
     
     return client_df, client_dict
 
-def get_qualifications(client):
-    attributes = []
-    if client.get("hatdiabetes", 0) == 1:
-        attributes.append("diabetes")
-    if client.get("brauchtpflege", 0) == 1:
-        attributes.append("pflege")
-
-    return attributes
+def get_qualifications(client) -> int:
+    """Bitmask of the qualifications the client needs, see `qualification_registry`."""
+    return qualification_registry.client_mask(client)
 
 def get_timewindow(client, weekday):
     timetable = client.get("aktuellerstundenplan")
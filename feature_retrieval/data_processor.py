@@ -11,12 +11,12 @@ from feature_retrieval.retrieve_ids import get_ma_assignments, get_open_client_i
 
 class DataProcessor:
     
-    def __init__(self, mas, clients, distances, experience_log) -> None:
+    def __init__(self, mas, clients, distance_index, experience_index) -> None:
         self.mas = mas
         self.clients = clients
         
-        self.distances = distances
-        self.experience_log = experience_log
+        self.distance_index = distance_index
+        self.experience_index = experience_index
         
 
     def get_mabw_records(self, vertretungen: List) -> Dict:
@@ -41,7 +41,7 @@ class DataProcessor:
             clients, date
         )
         mas_df, mas_dict = aggregate_ma_features(
-            mas, self.distances, clients_dict, self.experience_log
+            mas, self.distance_index, clients_dict, self.experience_index
         )
         
         return clients_df, mas_df
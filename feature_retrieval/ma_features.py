@@ -2,7 +2,9 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
 import pandas as pd
 
-def aggregate_ma_features(ma_objects: List, distances: List, clients_dict: Dict, experience_log: List) -> Tuple[pd.DataFrame, Dict]:
+from feature_retrieval.qualifications import qualification_registry
+
+def aggregate_ma_features(ma_objects: List, distance_index: Dict, clients_dict: Dict, experience_index: Dict) -> Tuple[pd.DataFrame, Dict]:
     ma_dict = {
         "id": [],
         "qualifications": [],
@@ -14,10 +16,10 @@ def aggregate_ma_features(ma_objects: List, distances: List, clients_dict: Dict,
     for ma in ma_objects:
         ma_dict["id"].append(ma["id"])
         ma_dict["qualifications"].append(get_ma_qualifications(ma))
-        experiences = get_experiences(ma["id"], clients_dict, experience_log)
+        experiences = get_experiences(ma["id"], clients_dict, experience_index)
         ma_dict["cl_experience"].append(experiences["client_experience"])
         ma_dict["school_experience"].append(experiences["school_experience"])
-        commute_time = create_commute_info(ma["id"], clients_dict, distances)
+        commute_time = create_commute_info(ma["id"], clients_dict, distance_index)
         ma_dict["timeToSchool"].append(commute_time)
         ma_dict["availability"].append(get_ma_availability(ma))
         
@@ -26,18 +28,36 @@ def aggregate_ma_features(ma_objects: List, distances: List, clients_dict: Dict,
     return ma_df, ma_dict
 
     
-def get_experiences(ma_id: str, clients_dict: Dict, experience_log: List[Dict]) -> Dict[str, int]:
+def build_experience_index(experience_log: List[Dict]) -> Dict[str, Dict[str, Dict[str, int]]]:
+    """Index the experience log as MA -> client/school -> number of days.
+
+    Only the first log entry per MA is considered and entries without any
+    recorded days are left out.
+    """
+    experience_index = {}
+    for entry in experience_log or []:
+        ma_id = entry.get("ma")
+        if ma_id in experience_index:
+            continue
+        experience_index[ma_id] = {
+            "client_experience": {
+                client_id: len(days) for client_id, days in entry.get("client_experience", {}).items() if days
+            },
+            "school_experience": {
+                school_id: len(days) for school_id, days in entry.get("school_experience", {}).items() if days
+            },
+        }
+    
+    return experience_index
+
+def get_experiences(ma_id: str, clients_dict: Dict, experience_index: Dict[str, Dict]) -> Dict[str, int]:
     
     experience_dict = {
         "client_experience": {},
         "school_experience": {}
     }
     
-    # Find MA's experience entry
-    ma_experience = next(
-        (entry for entry in experience_log if entry.get("ma") == ma_id),
-        None
-    )
+    ma_experience = experience_index.get(ma_id)
     
     if not ma_experience:
         return experience_dict
@@ -50,42 +70,37 @@ def get_experiences(ma_id: str, clients_dict: Dict, experience_log: List[Dict])
 def get_client_experience_dict(ma_experience: Dict, clients_dict: Dict) -> Dict[str, int]:
     
     experience_dict = {}	
-    # Get the client experience data
-    experience_data = ma_experience.get("client_experience", {})
+    # Days per client for this MA
+    experience_data = ma_experience["client_experience"]
+    if not experience_data:
+        return experience_dict
     
-    # Count experience for each client
     for client_id in clients_dict["id"]:
-        client_experience = experience_data.get(client_id, [])
-        if client_experience:
-            experience_dict[client_id] = len(client_experience)
+        if client_id in experience_data:
+            experience_dict[client_id] = experience_data[client_id]
     
     return experience_dict
 
 def get_school_experience_dict(ma_experience: Dict, clients_dict: Dict) -> Dict[str, int]:
     
     experience_dict = {}
-        # Get the school experience data
-    experience_data = ma_experience.get("school_experience", {})
+    # Days per school for this MA
+    experience_data = ma_experience["school_experience"]
+    if not experience_data:
+        return experience_dict
     
     # Get unique school IDs from clients
     school_ids = set(clients_dict.get("school"))
     
-    # Count experience for each school
     for school_id in school_ids:
-        school_experience = experience_data.get(school_id, [])
-        if school_experience:
-            experience_dict[school_id] = len(school_experience)
+        if school_id in experience_data:
+            experience_dict[school_id] = experience_data[school_id]
     
     return experience_dict
 
-def get_ma_qualifications(ma):
-    attributes = []
-    if ma.get("kanndiabetes", 0) == 1:
-        attributes.append("diabetes")
-    if ma.get("kannpflege", 0) == 1:
-        attributes.append("pflege")
-
-    return attributes
+def get_ma_qualifications(ma) -> int:
+    """Bitmask of the MA's qualifications, see `qualification_registry`."""
+    return qualification_registry.ma_mask(ma)
 
 def get_ma_availability(ma):
     start = datetime.strptime("00:00:00", '%H:%M:%S').time()
@@ -99,33 +114,36 @@ def get_ma_availability(ma):
         end_as_float = end.hour + end.minute / 60
         return (start_as_float, end_as_float)
 
-def prepare_distances(distances, ma_id):
-    
-    test_ma = "7c1bea51-21ba-4d24-9b91-98287bfabb7c"
-    # Preprocess the distances into a dictionary for faster lookups
-    distance_dict = {}
-    for distance in distances:
-        if distance.get("mitarbeiterin", {}).get("id") == ma_id:
-            school_id = distance.get("schule", {}).get("id")
-            if school_id not in distance_dict:
-                distance_dict[school_id] = distance
+def build_distance_index(distances: List[Dict]) -> Dict[str, Dict[str, int]]:
+    """Index the distance table as MA -> school -> commute minutes.
+
+    Only the first record per MA/school pair is considered and schools that are
+    60 km or further away are left out, so a row of the index can be used
+    directly as an MA's `timeToSchool`.
+    """
+    distance_index = {}
+    seen_pairs = set()
+    for distance in distances or []:
+        ma_id = distance.get("mitarbeiterin", {}).get("id")
+        school_id = distance.get("schule", {}).get("id")
+        if (ma_id, school_id) in seen_pairs:
+            continue
+        seen_pairs.add((ma_id, school_id))
+        
+        dist = distance.get("einfachdistanzluft", None)
+        if dist is not None and dist < 60000:
+            dist_in_min = int(dist / 1000)
+            distance_index.setdefault(ma_id, {})[school_id] = dist_in_min if dist_in_min > 0 else 1
     
-    return distance_dict
+    return distance_index
     
-def create_commute_info(ma_id: str, clients: dict, distances: list) -> Dict[str, int]:
-    # Preprocess the distances into a dictionary for faster lookups
-    distance_dict = prepare_distances(distances, ma_id)
+def create_commute_info(ma_id: str, clients: dict, distance_index: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+    ma_distances = distance_index.get(ma_id, {})
     
-    # Build the result using the preprocessed dictionary
     result = {}
     for school_id in clients["school"]:
         if school_id is None: continue
-        school_prefix = school_id
-        if school_prefix in distance_dict:
-            dist_data = distance_dict[school_prefix]
-            dist = dist_data.get("einfachdistanzluft", None)
-            if dist is not None and dist < 60000:
-                dist_in_min = int(dist / 1000)
-                result[school_prefix] = dist_in_min if dist_in_min > 0 else 1
+        if school_id in ma_distances:
+            result[school_id] = ma_distances[school_id]
                 
     return result
\ No newline at end of file
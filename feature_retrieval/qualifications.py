@@ -0,0 +1,68 @@
+from typing import Dict, List, NamedTuple
+
+# Qualification sets are stored in int64 columns, the sign bit stays unused
+MAX_QUALIFICATIONS = 63
+
+
+class Qualification(NamedTuple):
+    name: str
+    # Flag on the client record that marks the qualification as needed
+    client_field: str
+    # Flag on the MA record that marks the qualification as present
+    ma_field: str
+
+
+class QualificationRegistry:
+    """Bit assignment for the qualification vocabulary.
+
+    Every registered qualification gets the next free bit, so a set of
+    qualifications is one integer. A client can be covered by an MA iff
+    `client_mask & ~ma_mask == 0`; the optimizer only sees the masks, so a
+    new qualification type needs nothing but a `register` call.
+    """
+
+    def __init__(self) -> None:
+        self._qualifications: Dict[str, Qualification] = {}
+        self._bits: Dict[str, int] = {}
+
+    def register(self, name: str, client_field: str, ma_field: str) -> int:
+        """Add a qualification and return its bit; registering the same fields again is a no-op.
+
+        Raises:
+            ValueError: If the name is registered with other fields, or all bits are taken.
+        """
+        qualification = Qualification(name, client_field, ma_field)
+        existing = self._qualifications.get(name)
+        if existing is not None:
+            if existing != qualification:
+                raise ValueError(f"Qualification '{name}' is already registered as {existing}")
+            return self._bits[name]
+        if len(self._qualifications) >= MAX_QUALIFICATIONS:
+            raise ValueError(f"At most {MAX_QUALIFICATIONS} qualifications can be registered")
+        self._qualifications[name] = qualification
+        self._bits[name] = 1 << len(self._bits)
+        return self._bits[name]
+
+    def names(self, mask: int) -> List[str]:
+        """Qualification names of a bitmask, in registration order."""
+        return [name for name, bit in self._bits.items() if int(mask) & bit]
+
+    def client_mask(self, client: Dict) -> int:
+        """Qualifications a client record needs."""
+        return self._record_mask(client, "client_field")
+
+    def ma_mask(self, ma: Dict) -> int:
+        """Qualifications an MA record has."""
+        return self._record_mask(ma, "ma_field")
+
+    def _record_mask(self, record: Dict, field: str) -> int:
+        mask = 0
+        for name, qualification in self._qualifications.items():
+            if record.get(getattr(qualification, field), 0) == 1:
+                mask |= self._bits[name]
+        return mask
+
+
+qualification_registry = QualificationRegistry()
+qualification_registry.register("diabetes", client_field="hatdiabetes", ma_field="kanndiabetes")
+qualification_registry.register("pflege", client_field="brauchtpflege", ma_field="kannpflege")
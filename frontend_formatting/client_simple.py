@@ -1,8 +1,8 @@
-from id_handling.name_generator import load_school_name_mappings
+from id_handling.name_generator import school_name_registry
 
 def client_simple(name, client_object):
     
-    school_name_mappings = load_school_name_mappings()
+    school_name_mappings = school_name_registry.names
     
     client = {
         "name": name,
@@ -1,10 +1,10 @@
-from id_handling.name_generator import load_school_name_mappings
-from id_handling.name_generator import load_name_mappings
+from id_handling.name_generator import school_name_registry
+from id_handling.name_generator import name_registry
 
 def ma_simple(name, ma_object):
     
-    name_mappings = load_name_mappings()
-    school_name_mappings = load_school_name_mappings()
+    name_mappings = name_registry.names
+    school_name_mappings = school_name_registry.names
     
     cl_experience_simple = [
         {"name": name_mappings[client_id], "tage": cl_experience}
@@ -1,55 +1,71 @@
-from retrieval_helper.get_distances import get_distances
+from retrieval_helper.get_distances import get_distance_index
 from retrieval_helper.get_clients import get_clients
 from retrieval_helper.get_mas import get_mas
-from retrieval_helper.get_experience_log import get_experience_log
+from retrieval_helper.get_experience_log import get_experience_index
 from retrieval_helper.get_vertretungen import get_vertretungen
+from retrieval_helper.snapshot_store import snapshot_store
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import datetime
-from typing import List, Dict
+import threading
+from typing import List, Dict, Tuple
+import numpy as np
 
 from feature_retrieval.data_processor import DataProcessor
 from feature_retrieval.retrieve_objects import get_objects_by_id
 
 from id_handling.name_generator import ensure_names_for_ids, ensure_school_names_for_ids
-from optimize.optimizer import Optimizer
-from optimize.utils.caching import cache_result, retrieve_cached_result
+from optimize.day_dataset import DayDataset
+from optimize.session import OptimizerSession
+from optimize.SoftConstraintHandler import resolve_weights
+from optimize.solver_params import DEFAULT_SOLVER_PARAMS, SolverParams
+from optimize.utils.caching import canonical_ids, compute_once, retrieve_cached_result, settings_key
 
 from frontend_formatting.ma_simple import ma_simple
 from frontend_formatting.client_simple import client_simple
 
-def get_recommendations(
+DEFAULT_DATE = datetime(2025, 3, 21)
+
+# Alternative clients shown per recommendation
+ALTERNATIVES_K = 3
+
+# CP-SAT limits of every solve, overridable via SOLVER_* environment variables
+SOLVER_PARAMS = SolverParams.from_env(DEFAULT_SOLVER_PARAMS)
+
+# Model sessions of recently used day datasets, reused for forced variants
+SESSION_CACHE_SIZE = 8
+# A future per key that resolves to the session once it is built
+_sessions: "OrderedDict[tuple, Future]" = OrderedDict()
+# Guards `_sessions` only, builds run outside of it
+_sessions_lock = threading.Lock()
+
+
+def build_day_dataset(
+    date: datetime,
     unavailable_clients: List[str] = None,
     unavailable_mas: List[str] = None,
-    forced_ma: str = None,
-    forced_client: str = None,
-    date: datetime = None,
-):
-    if date is None:
-        date = datetime(2025, 3, 21)
-
-    setting_str = (
-        f"unavailable_clients: {unavailable_clients}, "
-        f"unavailable_mas: {unavailable_mas}, "
-        f"forced_ma: {forced_ma}, "
-        f"forced_client: {forced_client}, "
-        f"date: {date.isoformat()}"
-    )
-    cached_result = retrieve_cached_result(setting_str)
-    if cached_result is not None:
-        clients = len(cached_result["clients"])
-        mas = len(cached_result["mas"])
-        print(f"Cached result found for {clients} clients and {mas} MAS")
-        return cached_result
-    
-    distances = get_distances()
+    vertretungen: List = None,
+) -> DayDataset:
+    """Assemble the typed MA and client dataset for the given date.
+
+    `vertretungen` are the records active on `date` if already known, e.g.
+    taken from one query for a whole planning horizon.
+
+    Returns:
+        The day dataset with names and `available_until` dates, already
+        filtered by the unavailable MAs and clients.
+    """
+    distance_index = get_distance_index()
     clients = get_clients()
     mas = get_mas()
     
     print(f"Using {len(clients)} clients and {len(mas)} MAS")
-    experience_log = get_experience_log()
+    experience_index = get_experience_index()
     
-    vertretungen = get_vertretungen(date)
+    if vertretungen is None:
+        vertretungen = get_vertretungen(date)
     
-    data_processor = DataProcessor(mas, clients, distances, experience_log)
+    data_processor = DataProcessor(mas, clients, distance_index, experience_index)
     
     # Retrieve open clients from todays vertretungen
     open_clients_vertretung, open_mas_vertretung = data_processor.get_mabw_records(vertretungen)
@@ -79,38 +95,287 @@ def get_recommendations(
     mas_df["available_until"] = mas_df["id"].map(lambda x: next((datetime.strptime(item["enddatum"], "%Y-%m-%d") for item in open_mas_vertretung if item["mavertretend"]["id"] == x), None))
     clients_df["available_until"] = clients_df["id"].map(lambda x: next((datetime.strptime(item["enddatum"], "%Y-%m-%d") for item in open_clients_vertretung if item["klientzubegleiten"]["id"] == x), None))
     
-    # remove entries from mas_df where timeToSchool is empty
-    mas_df = mas_df[mas_df["timeToSchool"] != {}].reset_index(drop=True)
-    print(f"After filtering: {len(mas_df)} MAS and {len(clients_df)} clients")
+    # Convert the dictionary columns once, before any MA or client is dropped
+    dataset = DayDataset.from_frames(mas_df, clients_df)
+    
+    # remove MAS that cannot reach any school of today's clients
+    ma_rows = ~np.isnan(dataset.travel_time).all(axis=1)
+    client_rows = np.ones(dataset.n_clients, dtype=bool)
+    print(f"After filtering: {int(ma_rows.sum())} MAS and {dataset.n_clients} clients")
     if unavailable_clients is not None:
-        clients_df = clients_df[~clients_df["id"].isin(unavailable_clients)].reset_index(drop=True)
+        client_rows &= ~np.isin(np.array(dataset.client_ids, dtype=object), list(unavailable_clients))
     if unavailable_mas is not None:
-        mas_df = mas_df[~mas_df["id"].isin(unavailable_mas)].reset_index(drop=True)
+        ma_rows &= ~np.isin(np.array(dataset.ma_ids, dtype=object), list(unavailable_mas))
+    
+    return dataset.select(ma_rows, client_rows)
+
+
+def get_session(
+    date: datetime,
+    unavailable_clients: List[str] = None,
+    unavailable_mas: List[str] = None,
+    solver: str = "cpsat",
+    solver_params: SolverParams = None,
+) -> OptimizerSession | None:
+    """Return the model session for a day dataset, building it on first use.
+
+    Sessions are keyed on the data snapshot version, so they are rebuilt
+    whenever one of the data files changes. Returns None if there are no MAs
+    or no clients to plan. Concurrent callers for the same key wait for a
+    single build; the module lock is only held for the lookup and insert, so
+    builds for other keys run in parallel.
+    """
+    key = (
+        snapshot_store.version,
+        date,
+        canonical_ids(unavailable_clients),
+        canonical_ids(unavailable_mas),
+        solver,
+        solver_params or SOLVER_PARAMS,
+    )
+    with _sessions_lock:
+        future = _sessions.get(key)
+        is_builder = future is None
+        if is_builder:
+            future = _sessions[key] = Future()
+            if len(_sessions) > SESSION_CACHE_SIZE:
+                _sessions.popitem(last=False)
+        else:
+            _sessions.move_to_end(key)
+    if not is_builder:
+        return future.result()
+
+    try:
+        dataset = build_day_dataset(date, unavailable_clients, unavailable_mas)
+        if dataset.n_mas == 0 or dataset.n_clients == 0:
+            print("No MAS or clients available. Returning None.")
+            session = None
+        else:
+            session = OptimizerSession(dataset, solver=solver, params=solver_params or SOLVER_PARAMS)
+    except BaseException as e:
+        _forget_session(key, future)
+        future.set_exception(e)
+        raise
+    if session is None:
+        # Only sessions are kept, a day without MAs or clients is checked again on the next call
+        _forget_session(key, future)
+    future.set_result(session)
+    return session
+
+
+def _forget_session(key: tuple, future: Future) -> None:
+    with _sessions_lock:
+        if _sessions.get(key) is future:
+            del _sessions[key]
+
+
+def get_recommendations(
+    unavailable_clients: List[str] = None,
+    unavailable_mas: List[str] = None,
+    forced_ma: str = None,
+    forced_client: str = None,
+    date: datetime = None,
+    solver: str = "cpsat",
+    solver_params: SolverParams = None,
+    weights: Dict[str, int] = None,
+):
+    if date is None:
+        date = DEFAULT_DATE
+    # Partial weights are completed with the defaults, so equal objectives share a cache key
+    weights = resolve_weights(weights)
+
+    # A forced pair only applies when both IDs are given
+    if not (forced_ma and forced_client):
+        forced_ma, forced_client = None, None
+
+    setting_str = settings_key(
+        unavailable_clients=canonical_ids(unavailable_clients),
+        unavailable_mas=canonical_ids(unavailable_mas),
+        forced_ma=forced_ma,
+        forced_client=forced_client,
+        date=date.isoformat(),
+        solver=solver,
+        data=snapshot_store.fingerprint(),
+        weights=weights,
+    )
+    cached_result = retrieve_cached_result(setting_str)
+    if cached_result is not None:
+        clients = len(cached_result["clients"])
+        mas = len(cached_result["mas"])
+        print(f"Cached result found for {clients} clients and {mas} MAS")
+        return cached_result
+    
+    def compute():
+        session = get_session(date, unavailable_clients, unavailable_mas, solver, solver_params)
+        if session is None:
+            return None
     
-    if len(mas_df) == 0 or len(clients_df) == 0:
-        output = {"assignment_info": [], "mas": mas_df.to_dict(orient="records"), "clients": clients_df.to_dict(orient="records")}
-        print("No MAS or clients available. Returning None.")
-        return None
+        # Variants of the same day may be solved concurrently, so the solution is
+        # passed along instead of being stored on the shared optimizer
+        result = session.solve_pairs(forced_ma=forced_ma, forced_client=forced_client, weights=weights)
+        print(f"Objective Value: {result[1] if result is not None else None}")
     
-    optimizer = Optimizer(mas_df, clients_df, forced_ma=forced_ma, forced_client=forced_client)
-    optimizer.create_model()
+        if result is not None:
+            results = session.optimizer.process_results(result[0], weights)
+            results["alternatives"] = format_alternatives(session, result[0], weights=weights)
+            results["solver_status"] = result[2]
+            mas, clients = format_day_dataset(session.optimizer.dataset)
+            output = {"assignment_info": results, "mas": mas, "clients": clients}
+        else:
+            print("No feasible solution found.")
+            # return {"assignment_info": None, "mas": mas_df.to_dict(orient="records"), "clients": clients_df.to_dict(orient="records")}
+            output = None
+        return output
+    
+    # Identical concurrent requests share a single solve. Only proven optima are
+    # cached for long, so the solver limits need not be part of the key and a
+    # plan cut short by a busy machine is only served for a few minutes.
+    return compute_once(setting_str, compute, cacheable=is_proven_optimal)
+    
+def get_ranked_recommendations(
+    k: int,
+    unavailable_clients: List[str] = None,
+    unavailable_mas: List[str] = None,
+    date: datetime = None,
+    solver: str = "cpsat",
+    weights: Dict[str, int] = None,
+):
+    """Return the k best distinct plans for a day, best first.
 
-    objective_value = optimizer.solve_model()
-    print(f"Objective Value: {objective_value}")
+    Returns:
+        A dictionary with `plans`, each holding its `objective`, the
+        per-component objective `breakdown` and the `assignment_info` in the
+        shape of `get_recommendations()` with its `solver_status`, plus the
+        shared `mas` and `clients`. The list ends early after a plan that is
+        not proven optimal. None if there are no MAs or clients to plan.
+    """
+    if date is None:
+        date = DEFAULT_DATE
+    weights = resolve_weights(weights)
+
+    setting_str = settings_key(
+        ranked_plans=k,
+        unavailable_clients=canonical_ids(unavailable_clients),
+        unavailable_mas=canonical_ids(unavailable_mas),
+        date=date.isoformat(),
+        solver=solver,
+        data=snapshot_store.fingerprint(),
+        weights=weights,
+    )
     
-    if objective_value is not None:
-        results = optimizer.process_results()
-        mas_df["available_until"] = mas_df["available_until"].apply(lambda x: x.strftime("%Y-%m-%d") if x is not None else None)
-        clients_df["available_until"] = clients_df["available_until"].apply(lambda x: x.strftime("%Y-%m-%d") if x is not None else None)
-        output = {"assignment_info": results, "mas": mas_df.to_dict(orient="records"), "clients": clients_df.to_dict(orient="records")}
-    else:
-        print("No feasible solution found.")
-        # return {"assignment_info": None, "mas": mas_df.to_dict(orient="records"), "clients": clients_df.to_dict(orient="records")}
-        output = None
+    def compute():
+        session = get_session(date, unavailable_clients, unavailable_mas, solver)
+        if session is None:
+            return None
         
-    cache_result(setting_str, output)    
-    return output
+        plans = []
+        for plan in session.optimizer.solve_k_best(k, weights):
+            results = session.optimizer.process_results(plan["pairs"], weights)
+            results["alternatives"] = format_alternatives(session, plan["pairs"], weights=weights)
+            results["solver_status"] = plan["status"]
+            plans.append({"objective": plan["objective"], "breakdown": plan["breakdown"], "assignment_info": results})
+        mas, clients = format_day_dataset(session.optimizer.dataset)
+        return {"plans": plans, "mas": mas, "clients": clients}
+    
+    return compute_once(setting_str, compute, cacheable=is_ranking_final)
+
+def is_proven_optimal(output: Dict | None) -> bool:
+    """Whether a `get_recommendations()` payload is proven optimal; None (no solution) counts as final."""
+    if output is None:
+        return True
+    status = output["assignment_info"].get("solver_status")
+    return status is None or status["proven_optimal"]
+
+def is_ranking_final(output: Dict | None) -> bool:
+    """Whether every plan of a `get_ranked_recommendations()` payload is proven optimal; None counts as final."""
+    if output is None:
+        return True
+    return all(is_proven_optimal(plan) for plan in output["plans"])
+
+def format_day_dataset(dataset: DayDataset) -> Tuple[List[Dict], List[Dict]]:
+    """MA and client records of a day dataset in the payload shape, dates formatted for JSON."""
+    return dataset.ma_records(), dataset.client_records()
+
+def format_alternatives(
+    session: OptimizerSession,
+    solution: List[Tuple[int, int]],
+    k: int = ALTERNATIVES_K,
+    weights: Dict[str, int] = None,
+) -> Dict[str, List[Dict]]:
+    """Cheapest clients to force per MA ID, ranked by the objective increase under `weights`."""
+    dataset = session.optimizer.dataset
+    alternatives = {}
+    for i, ranked in session.alternatives(solution, k, weights=weights).items():
+        alternatives.setdefault(
+            dataset.ma_ids[i],
+            [{"klient": dataset.client_ids[j], "objective_increase": increase} for j, increase in ranked],
+        )
+    return alternatives
+
+def build_output_index(output: Dict, k: int = ALTERNATIVES_K) -> Dict[str, Dict]:
+    """Index a recommendation payload for formatting in linear time.
+
+    Args:
+        output: Full recommendation payload returned by `get_recommendations()`.
+        k: Number of alternatives kept per MA.
+
+    Returns:
+        A dictionary with the raw `mas` and `clients` keyed by ID (first
+        occurrence wins), `clients_by_school` keeping the order of the payload,
+        and `alternatives`, the ranked top `k + 1` candidate clients per MA;
+        one more than needed so the assigned client can still be dropped.
+        `k` records the bound used. Rankings computed by the optimizer (see
+        `format_alternatives`) are used when the payload has them, the
+        experience/distance heuristic otherwise.
+    """
+    mas_by_id = {}
+    for raw_ma in output["mas"]:
+        mas_by_id.setdefault(raw_ma.get("id"), raw_ma)
+    clients_by_id = {}
+    clients_by_school = {}
+    for raw_client in output["clients"]:
+        clients_by_id.setdefault(raw_client.get("id"), raw_client)
+        clients_by_school.setdefault(raw_client.get("school"), []).append(raw_client)
     
+    index = {"mas": mas_by_id, "clients": clients_by_id, "clients_by_school": clients_by_school, "k": k}
+    optimizer_alternatives = (output.get("assignment_info") or {}).get("alternatives")
+    if optimizer_alternatives is not None:
+        index["alternatives"] = {
+            ma_id: [clients_by_id[alternative["klient"]] for alternative in ranked[:k]]
+            for ma_id, ranked in optimizer_alternatives.items()
+        }
+    else:
+        index["alternatives"] = {ma_id: rank_alternatives(index, raw_ma, k + 1) for ma_id, raw_ma in mas_by_id.items()}
+    return index
+
+def rank_alternatives(index: Dict[str, Dict], ma: Dict, limit: int) -> List[Dict]:
+    """Rank up to `limit` distinct raw clients as alternatives for an MA.
+
+    Clients the MA has worked with come first, then clients at schools the MA
+    knows, then clients at the remaining reachable schools, closest first.
+    """
+    clients_by_id = index["clients"]
+    clients_by_school = index["clients_by_school"]
+    
+    def candidates():
+        for client_id in ma["cl_experience"].keys():
+            if client_id in clients_by_id:
+                yield clients_by_id[client_id]
+        for school_name in ma["school_experience"].keys():
+            yield from clients_by_school.get(school_name, ())
+        for school_name, _ in sorted(ma["timeToSchool"].items(), key=lambda x: x[1]):
+            yield from clients_by_school.get(school_name, ())
+    
+    ranked = []
+    seen = set()
+    for raw_client in candidates():
+        if len(ranked) >= limit:
+            break
+        if raw_client["id"] not in seen:
+            seen.add(raw_client["id"])
+            ranked.append(raw_client)
+    return ranked
+
 def prepare_output(output: Dict) -> Dict:
     """Build the frontend-ready recommendation list from optimizer output.
 
@@ -127,19 +392,17 @@ def prepare_output(output: Dict) -> Dict:
         `mitarbeiter`, the assigned `klient`, and `alternativeKlienten`.
     """
     assignments = output["assignment_info"]["assigned_pairs"]
+    index = build_output_index(output)
     
     recommendations = []
     
     for assignment in assignments:
-        ma = assignment["ma"]
-        client = assignment["klient"]
-        
-        raw_ma = next((d for d in output["mas"] if d.get("id") == ma), None)
-        raw_client = next((d for d in output["clients"] if d.get("id") == client), None)
+        raw_ma = index["mas"][assignment["ma"]]
+        raw_client = index["clients"][assignment["klient"]]
         
         assignment_ma = ma_simple(raw_ma["name"], raw_ma)
         assignment_client = client_simple(raw_client["name"], raw_client)
-        alternative_clients = find_alternatives(output["clients"], raw_ma, raw_client["id"])
+        alternative_clients = find_alternatives(output["clients"], raw_ma, raw_client["id"], index=index)
         
         recommendations.append({"mitarbeiter": assignment_ma, "klient": assignment_client, "alternativeKlienten": alternative_clients})
     
@@ -160,62 +423,43 @@ def get_mas_and_clients(output: Dict) -> tuple[Dict, Dict]:
         contains the simplified frontend representation.
     """
     assignments = output["assignment_info"]["assigned_pairs"]
+    mas_by_id = {}
+    for raw_ma in output["mas"]:
+        mas_by_id.setdefault(raw_ma.get("id"), raw_ma)
+    clients_by_id = {}
+    for raw_client in output["clients"]:
+        clients_by_id.setdefault(raw_client.get("id"), raw_client)
     
     mas = {}
     clients = {}
     
     for assignment in assignments:
-        ma = assignment["ma"]
-        client = assignment["klient"]
-        
-        raw_ma = next((d for d in output["mas"] if d.get("id") == ma), None)
-        raw_client = next((d for d in output["clients"] if d.get("id") == client), None)
+        raw_ma = mas_by_id[assignment["ma"]]
+        raw_client = clients_by_id[assignment["klient"]]
         
         mas[raw_ma["id"]] = ma_simple(raw_ma["name"], raw_ma)
         clients[raw_client["id"]] = client_simple(raw_client["name"], raw_client)
     
     return mas, clients
 
-def find_alternatives(clients: List[Dict], ma: Dict, client_id: str):
+def find_alternatives(clients: List[Dict], ma: Dict, client_id: str, index: Dict[str, Dict] = None, k: int = ALTERNATIVES_K):
+    """Return up to `k` simplified alternative clients for an MA, excluding `client_id`.
+
+    Pass the `build_output_index()` of the payload to reuse its precomputed
+    ranking; otherwise the clients are indexed for this call.
+    """
+    if index is None:
+        index = build_output_index({"mas": [], "clients": clients}, k)
+    ranked = index["alternatives"].get(ma["id"]) if index["k"] >= k else None
+    if ranked is None:
+        ranked = rank_alternatives(index, ma, k + 1)
     
-    print(ma)
     alternatives = []
-    not_yet_tried = [client["id"] for client in clients if client["id"] != client_id]
-    
-    for client_id in ma["cl_experience"].keys():
-        # make sure the client is not already assigned
-        if len(alternatives) >= 3:
-            return alternatives
-        if client_id in not_yet_tried:
-            raw_client = next((d for d in clients if d.get("id") == client_id), None)
-            alternatives.append(
-                client_simple(raw_client["name"], raw_client)
-            )
-            not_yet_tried.remove(client_id)
-    
-    for school_name in ma["school_experience"].keys():
-        all_school_clients = [d for d in clients if d.get("school") == school_name]
-        for raw_client in all_school_clients:
-            if len(alternatives) >= 3:
-                return alternatives
-            if raw_client["id"] in not_yet_tried:
-                alternatives.append(
-                    client_simple(raw_client["name"], raw_client)
-                )
-                not_yet_tried.remove(raw_client["id"])
-    
-    schools_ordered_dist = sorted(ma["timeToSchool"].items(), key=lambda x: x[1])
-    for school_name, _ in schools_ordered_dist:
-        all_school_clients = [d for d in clients if d.get("school") == school_name]
-        for raw_client in all_school_clients:
-            if len(alternatives) >= 3:
-                return alternatives
-            if raw_client["id"] in not_yet_tried:
-                alternatives.append(
-                    client_simple(raw_client["name"], raw_client)
-                )
-                not_yet_tried.remove(raw_client["id"])
-    
+    for raw_client in ranked:
+        if len(alternatives) >= k:
+            break
+        if raw_client["id"] != client_id:
+            alternatives.append(client_simple(raw_client["name"], raw_client))
     return alternatives
 
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
-import json
-import os
 import random
 from typing import Dict
 
+from id_handling.name_registry import NameRegistry
+from id_handling.name_store import NameStore
+
 # Common first and last names for random generation
 FIRST_NAMES = [
     "Anna", "Max", "Sophie", "Tom", "Emma", "Lukas", "Hannah", "Felix", "Mia", "Noah",
@@ -18,51 +19,21 @@ LAST_NAMES = [
     "Schmid", "Schulze", "Maier", "Köhler", "Herrmann", "König", "Walter", "Huber", "Mayer", "Peters"
 ]
 
-# Path to the name storage file
+# Path to the legacy name storage file, imported into the name database
 NAME_STORAGE_FILE = "data/name_mappings.json"
 
-# Path to the school name storage file
+# Path to the legacy school name storage file, imported into the name database
 SCHOOL_NAME_STORAGE_FILE = "data/school_name_mappings.json"
 
 
 def load_name_mappings() -> Dict[str, str]:
-    """Load name mappings from file. Returns empty dict if file doesn't exist."""
-    if os.path.exists(NAME_STORAGE_FILE):
-        try:
-            with open(NAME_STORAGE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {}
-    return {}
-
-
-def save_name_mappings(mappings: Dict[str, str]) -> None:
-    """Save name mappings to file."""
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(NAME_STORAGE_FILE), exist_ok=True)
-    
-    with open(NAME_STORAGE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(mappings, f, indent=2, ensure_ascii=False)
+    """Return a copy of all MA and client name mappings."""
+    return dict(name_registry.names)
 
 
 def load_school_name_mappings() -> Dict[str, str]:
-    """Load school name mappings from file. Returns empty dict if file doesn't exist."""
-    if os.path.exists(SCHOOL_NAME_STORAGE_FILE):
-        try:
-            with open(SCHOOL_NAME_STORAGE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {}
-    return {}
-
-
-def save_school_name_mappings(mappings: Dict[str, str]) -> None:
-    """Save school name mappings to file."""
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(SCHOOL_NAME_STORAGE_FILE), exist_ok=True)
-    
-    with open(SCHOOL_NAME_STORAGE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(mappings, f, indent=2, ensure_ascii=False)
+    """Return a copy of all school name mappings."""
+    return dict(school_name_registry.names)
 
 
 def generate_random_name() -> str:
@@ -78,42 +49,50 @@ def generate_random_school_name() -> str:
     return f"{last_name}-Schule"
 
 
-def _generate_unique_name(existing_names: set, generator) -> str:
-    """Generate a name that is not in existing_names. Uses generator() and retries until unique."""
-    used = set(existing_names)
-    max_attempts = 10_000  # avoid infinite loop if pool is exhausted
+def _generate_unique_name(existing_names: set, generator, suffixes: Dict[str, int] = None) -> str:
+    """Generate a name that is not in existing_names.
+
+    Tries a bounded number of random names first. Once the pool is (nearly)
+    exhausted, a numeric suffix is appended; `suffixes` remembers the next free
+    suffix per base name, so generation stays O(1) amortised.
+    """
+    max_attempts = 100
     for _ in range(max_attempts):
         name = generator()
-        if name not in used:
+        if name not in existing_names:
             return name
     # fallback: append a suffix to make unique
     base = generator()
-    idx = 0
-    while f"{base} ({idx})" in used:
+    suffixes = suffixes if suffixes is not None else {}
+    idx = suffixes.get(base, 0)
+    while f"{base} ({idx})" in existing_names:
         idx += 1
+    suffixes[base] = idx + 1
     return f"{base} ({idx})"
 
 
+_name_suffixes: Dict[str, int] = {}
+_school_name_suffixes: Dict[str, int] = {}
+
+# Shared in-memory registries over the name database, loaded on first use.
+# The old JSON files are imported into the database once.
+name_registry = NameRegistry(
+    NameStore("person", json_seed=NAME_STORAGE_FILE),
+    lambda used_names: _generate_unique_name(used_names, generate_random_name, _name_suffixes),
+)
+school_name_registry = NameRegistry(
+    NameStore("school", json_seed=SCHOOL_NAME_STORAGE_FILE),
+    lambda used_names: _generate_unique_name(used_names, generate_random_school_name, _school_name_suffixes),
+)
+
+
 def ensure_names_for_ids(ids: list) -> Dict[str, str]:
     """
     Ensure that all provided IDs have names in the storage.
     If a name doesn't exist for an ID, generate a unique one and save it.
     Returns a dictionary mapping ID to name. All names are unique.
     """
-    name_mappings = load_name_mappings()
-    updated = False
-    used_names = set(name_mappings.values())
-
-    for id_value in ids:
-        if id_value not in name_mappings:
-            name_mappings[id_value] = _generate_unique_name(used_names, generate_random_name)
-            used_names.add(name_mappings[id_value])
-            updated = True
-
-    if updated:
-        save_name_mappings(name_mappings)
-
-    return {id_value: name_mappings[id_value] for id_value in ids}
+    return name_registry.ensure(ids)
 
 
 def ensure_school_names_for_ids(ids: list) -> Dict[str, str]:
@@ -122,20 +101,4 @@ def ensure_school_names_for_ids(ids: list) -> Dict[str, str]:
     If a name doesn't exist for an ID, generate a unique one and save it.
     Returns a dictionary mapping school ID to school name. All names are unique.
     """
-    school_name_mappings = load_school_name_mappings()
-    updated = False
-    used_names = set(school_name_mappings.values())
-
-    for id_value in ids:
-        if id_value not in school_name_mappings:
-            school_name_mappings[id_value] = _generate_unique_name(
-                used_names, generate_random_school_name
-            )
-            used_names.add(school_name_mappings[id_value])
-            updated = True
-
-    if updated:
-        save_school_name_mappings(school_name_mappings)
-
-    return {id_value: school_name_mappings[id_value] for id_value in ids}
-
+    return school_name_registry.ensure(ids)
@@ -0,0 +1,95 @@
+import threading
+from typing import Callable, Dict, Iterable, Iterator, Mapping
+
+from id_handling.name_store import NameStore, missing_ids
+
+
+class _NamesView(Mapping):
+    """Read-only view of a registry's names that re-reads the store on a miss."""
+
+    def __init__(self, registry: "NameRegistry") -> None:
+        self._registry = registry
+
+    def __getitem__(self, id_value: str) -> str:
+        return self._registry[id_value]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._registry._snapshot())
+
+    def __len__(self) -> int:
+        return len(self._registry._snapshot())
+
+
+class NameRegistry:
+    """In-memory ID -> display name mapping in front of a `NameStore`.
+
+    Known names are served from memory. A lookup of an unknown ID first reads
+    the rows that other processes added since the last read, so names
+    generated by another worker (e.g. for a payload from the shared cache)
+    are found. `ensure` assigns names to unknown IDs and inserts all new
+    names of one call in a single transaction.
+    """
+
+    def __init__(self, store: NameStore, generate_unique: Callable[[set], str]) -> None:
+        self.store = store
+        # Called with the set of used names, returns a name not in it
+        self.generate_unique = generate_unique
+        self._names: Dict[str, str] = {}
+        self._used_names: set = set()
+        self._last_rowid = None
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        # Update in place so that views handed out by `names` stay current
+        new_names, self._last_rowid = self.store.load_since(self._last_rowid or 0)
+        self._names.update(new_names)
+        self._used_names.update(new_names.values())
+
+    def _next_name(self) -> str:
+        name = self.generate_unique(self._used_names)
+        # Reserve it right away, so a retry after a conflict picks another one
+        self._used_names.add(name)
+        return name
+
+    def _snapshot(self) -> Dict[str, str]:
+        with self._lock:
+            if self._last_rowid is None:
+                self._refresh()
+            return dict(self._names)
+
+    def _lookup(self, id_value: str) -> str | None:
+        name = self._names.get(id_value) if self._last_rowid is not None else None
+        if name is None:
+            with self._lock:
+                # Another worker may have named it since the last read
+                self._refresh()
+                name = self._names.get(id_value)
+        return name
+
+    @property
+    def names(self) -> Mapping[str, str]:
+        """Read-only view of all names; looking up an unknown ID re-reads the store."""
+        return _NamesView(self)
+
+    def get(self, id_value: str, default: str = None) -> str | None:
+        name = self._lookup(id_value)
+        return default if name is None else name
+
+    def __getitem__(self, id_value: str) -> str:
+        name = self._lookup(id_value)
+        if name is None:
+            raise KeyError(id_value)
+        return name
+
+    def ensure(self, ids: Iterable[str]) -> Dict[str, str]:
+        """Return names for the given IDs, generating unique ones where missing."""
+        ids = list(ids)
+        with self._lock:
+            if self._last_rowid is None or missing_ids(ids, self._names):
+                self._refresh()
+            missing = missing_ids(ids, self._names)
+            if missing:
+                self._names.update(self.store.insert(missing, self._next_name))
+                self._refresh()
+
+            return {id_value: self._names[id_value] for id_value in ids}
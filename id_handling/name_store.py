@@ -0,0 +1,131 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Database shared by all worker processes
+NAME_DB_FILE = "data/names.sqlite3"
+
+
+class NameStore:
+    """Persistent ID -> name mapping of one kind ("person", "school") in SQLite.
+
+    IDs and names are both unique per kind, enforced by the database, so
+    concurrent workers can never hand out the same name twice or lose each
+    other's inserts. Rows are only ever added; `load_since` reads just the
+    rows that are new since the last call.
+    """
+
+    def __init__(self, kind: str, path: str = NAME_DB_FILE, json_seed: str = None) -> None:
+        self.kind = kind
+        self.path = path
+        # Old `{id: name}` JSON file whose mappings are imported on first use
+        self.json_seed = json_seed
+        self._local = threading.local()
+        self._ready = False
+        self._setup_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        if not self._ready:
+            with self._setup_lock:
+                if not self._ready:
+                    self._setup(connection)
+        return connection
+
+    def _setup(self, connection: sqlite3.Connection) -> None:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS names ("
+            "kind TEXT NOT NULL, id TEXT NOT NULL, name TEXT NOT NULL, "
+            "PRIMARY KEY (kind, id), UNIQUE (kind, name))"
+        )
+        self._ready = True
+        if self.json_seed is not None:
+            self.import_json(self.json_seed)
+
+    def import_json(self, json_path: str) -> int:
+        """Add the mappings of an old `{id: name}` JSON file; existing IDs and names win."""
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                mappings = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return 0
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            imported = 0
+            for id_value, name in mappings.items():
+                imported += connection.execute(
+                    "INSERT OR IGNORE INTO names (kind, id, name) VALUES (?, ?, ?)",
+                    (self.kind, id_value, name),
+                ).rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return imported
+
+    def load_since(self, rowid: int = 0) -> Tuple[Dict[str, str], int]:
+        """Mappings added after `rowid`, and the highest rowid seen."""
+        rows = self._connection().execute(
+            "SELECT rowid, id, name FROM names WHERE kind = ? AND rowid > ? ORDER BY rowid",
+            (self.kind, rowid),
+        ).fetchall()
+        mappings = {id_value: name for _, id_value, name in rows}
+        return mappings, rows[-1][0] if rows else rowid
+
+    def load(self) -> Dict[str, str]:
+        return self.load_since(0)[0]
+
+    def insert(self, ids: Iterable[str], generate_unique: Callable[[], str]) -> Dict[str, str]:
+        """Atomically assign names to the given IDs and return their stored names.
+
+        IDs that another process named in the meantime keep that name, and a
+        generated name that is already taken is replaced by a fresh one.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            names = {}
+            for id_value in ids:
+                row = connection.execute(
+                    "SELECT name FROM names WHERE kind = ? AND id = ?", (self.kind, id_value)
+                ).fetchone()
+                while row is None:
+                    try:
+                        name = generate_unique()
+                        connection.execute(
+                            "INSERT INTO names (kind, id, name) VALUES (?, ?, ?)", (self.kind, id_value, name)
+                        )
+                        row = (name,)
+                    except sqlite3.IntegrityError:
+                        # Name taken by another process, try the next one
+                        continue
+                names[id_value] = row[0]
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return names
+
+    def export_json(self, json_path: str) -> None:
+        """Write all mappings as an `{id: name}` JSON file, e.g. for offline scripts."""
+        os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.load(), f, indent=2, ensure_ascii=False)
+
+
+def missing_ids(ids: Iterable[str], known: Dict[str, str]) -> List[str]:
+    """IDs without a name, de-duplicated in order of appearance."""
+    return [id_value for id_value in dict.fromkeys(ids) if id_value not in known]
@@ -0,0 +1,115 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import NegativeCycleError, shortest_path
+from typing import Dict, List, Tuple
+
+from optimize.assignment_solver import solve_assignment
+
+
+def _objective(cost_matrix: np.ndarray, unassigned_cost: int, solution: List[Tuple[int, int]]) -> int:
+    return int(unassigned_cost) * (cost_matrix.shape[1] - len(solution)) + sum(
+        int(cost_matrix[i, j]) for i, j in solution
+    )
+
+
+def marginal_costs(
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    solution: List[Tuple[int, int]],
+) -> np.ndarray:
+    """Objective increase of forcing each MA/client pair, for all pairs at once.
+
+    The matching is a min-cost flow through a hub node (hub -> MA -> client
+    -> hub), so forcing pair (i, j) costs the pair's own gain plus the
+    shortest path from client j back to MA i in the residual graph of the
+    optimal solution. One batch of shortest paths from every client gives the
+    exact value for every pair, equal to `solve_assignment(..., forced_pair)`
+    minus the optimum, without a re-solve per pair.
+
+    Args:
+        cost_matrix: Integer (#MA x #clients) objective coefficient per pair.
+        eligible: Boolean (#MA x #clients) mask of pairs that may be assigned.
+        unassigned_cost: Objective contribution of a single unassigned client.
+        solution: Assigned (MA index, client index) pairs of the current plan.
+
+    Returns:
+        A float (#MA x #clients) matrix; 0 for pairs that are already assigned.
+        If `solution` is not optimal, the increase is still measured against
+        `solution` itself.
+    """
+    n_mas, n_clients = cost_matrix.shape
+    gain = cost_matrix.astype(float) - unassigned_cost
+    assigned = np.zeros((n_mas, n_clients), dtype=bool)
+    for i, j in solution:
+        assigned[i, j] = True
+    ma_assigned = assigned.any(axis=1)
+    client_assigned = assigned.any(axis=0)
+
+    # Node 0 is the hub, then the MAs, then the clients
+    hub = 0
+    ma_nodes = 1 + np.arange(n_mas)
+    client_nodes = 1 + n_mas + np.arange(n_clients)
+
+    unused_rows, unused_cols = np.nonzero(eligible & ~assigned)
+    used_rows, used_cols = np.nonzero(assigned)
+    sources = np.concatenate([
+        ma_nodes[unused_rows],
+        client_nodes[used_cols],
+        np.where(ma_assigned, ma_nodes, hub),
+        np.where(client_assigned, hub, client_nodes),
+    ])
+    targets = np.concatenate([
+        client_nodes[unused_cols],
+        ma_nodes[used_rows],
+        np.where(ma_assigned, hub, ma_nodes),
+        np.where(client_assigned, client_nodes, hub),
+    ])
+    weights = np.concatenate([
+        gain[unused_rows, unused_cols],
+        -gain[used_rows, used_cols],
+        np.zeros(n_mas),
+        np.zeros(n_clients),
+    ])
+    n_nodes = 1 + n_mas + n_clients
+    graph = coo_matrix((weights, (sources, targets)), shape=(n_nodes, n_nodes)).tocsr()
+
+    try:
+        distances = shortest_path(graph, method="J", directed=True, indices=client_nodes)
+    except NegativeCycleError:
+        # Not an optimal solution: measure against the optimum, then shift
+        optimal, optimal_objective = solve_assignment(cost_matrix, eligible, unassigned_cost)
+        shift = optimal_objective - _objective(cost_matrix, unassigned_cost, solution)
+        return marginal_costs(cost_matrix, eligible, unassigned_cost, optimal) + shift
+
+    # distances[j, node] is the path from client j; pick the paths back to every MA
+    increase = gain + distances[:, ma_nodes].T
+    increase[assigned] = 0.0
+    return increase
+
+
+def top_k_alternatives(
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    solution: List[Tuple[int, int]],
+    k: int = 3,
+) -> Dict[int, List[Tuple[int, int]]]:
+    """The k eligible clients per MA whose forcing increases the objective least.
+
+    Returns:
+        For every MA index, up to k `(client index, objective increase)`
+        tuples, cheapest first. The MA's current client is left out.
+    """
+    increase = marginal_costs(cost_matrix, eligible, unassigned_cost, solution)
+    assigned = np.zeros(cost_matrix.shape, dtype=bool)
+    for i, j in solution:
+        assigned[i, j] = True
+    candidates = np.where(eligible & ~assigned, increase, np.inf)
+
+    alternatives = {}
+    for i, row in enumerate(candidates):
+        # Stable sort keeps client order for ties
+        order = np.argsort(row, kind="stable")[:k]
+        alternatives[i] = [(int(j), int(round(row[j]))) for j in order if np.isfinite(row[j])]
+    return alternatives
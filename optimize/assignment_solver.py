@@ -0,0 +1,55 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from typing import List, Tuple
+
+
+def solve_assignment(
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    forced_pair: Tuple[int, int] = None,
+) -> Tuple[List[Tuple[int, int]], int]:
+    """Solve the MA/client matching as a min-cost linear assignment.
+
+    Every client that stays unassigned costs `unassigned_cost`, so assigning an
+    eligible pair changes the objective by `cost - unassigned_cost`. Pairs that
+    are ineligible or would not improve on leaving the client unassigned get a
+    cost of zero and act as the "unassigned" column for that row; they are
+    dropped from the result.
+
+    Args:
+        cost_matrix: Integer (#MA x #clients) objective coefficient per pair.
+        eligible: Boolean (#MA x #clients) mask of pairs that may be assigned.
+        unassigned_cost: Objective contribution of a single unassigned client.
+        forced_pair: Optional (MA index, client index) that must be assigned.
+
+    Returns:
+        The assigned (MA index, client index) pairs in row-major order and the
+        objective value of the assignment, identical to the CP model objective.
+    """
+    n_mas, n_clients = cost_matrix.shape
+    rows = np.arange(n_mas)
+    cols = np.arange(n_clients)
+    pairs = []
+
+    if forced_pair is not None:
+        # Fix the forced row and column and solve the rest without them
+        pairs.append(forced_pair)
+        rows = rows[rows != forced_pair[0]]
+        cols = cols[cols != forced_pair[1]]
+
+    gain = cost_matrix[np.ix_(rows, cols)] - unassigned_cost
+    reduced = np.where(eligible[np.ix_(rows, cols)], np.minimum(gain, 0), 0)
+    if reduced.size:
+        row_ind, col_ind = linear_sum_assignment(reduced)
+        pairs.extend(
+            (int(rows[r]), int(cols[c]))
+            for r, c in zip(row_ind, col_ind)
+            if reduced[r, c] < 0
+        )
+
+    pairs.sort()
+    objective = int(unassigned_cost) * (n_clients - len(pairs)) + sum(
+        int(cost_matrix[i, j]) for i, j in pairs
+    )
+    return pairs, objective
@@ -0,0 +1,29 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from typing import List, Tuple
+
+
+def find_components(eligible: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Split the eligibility graph into independent MA/client groups.
+
+    Returns one (MA indices, client indices) tuple per connected component that
+    contains at least one eligible pair, largest component first. MAs and
+    clients without any eligible pair belong to no component.
+    """
+    n_mas, n_clients = eligible.shape
+    rows, cols = np.nonzero(eligible)
+    graph = coo_matrix(
+        (np.ones(len(rows), dtype=bool), (rows, n_mas + cols)),
+        shape=(n_mas + n_clients, n_mas + n_clients),
+    )
+    n_components, labels = connected_components(graph, directed=False)
+
+    ma_labels = labels[:n_mas]
+    client_labels = labels[n_mas:]
+    components = []
+    for label in np.unique(labels[rows]) if len(rows) else []:
+        components.append((np.flatnonzero(ma_labels == label), np.flatnonzero(client_labels == label)))
+
+    components.sort(key=lambda component: len(component[0]) * len(component[1]), reverse=True)
+    return components
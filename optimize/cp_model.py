@@ -0,0 +1,83 @@
+import cpmpy as cp
+import numpy as np
+from typing import Dict, List, Tuple
+
+
+def cp_objective(
+    cost_matrix: np.ndarray,
+    unassigned_cost: int,
+    assignments: Dict[Tuple[int, int], cp.boolvar],
+    unassigned_clients: List,
+):
+    """Objective expression over existing model variables, e.g. to swap in other weights."""
+    objective = unassigned_cost * sum(unassigned_clients)
+    if assignments:
+        rows, cols = zip(*assignments.keys())
+        coefficients = cost_matrix[list(rows), list(cols)]
+        objective = objective + cp.sum(coefficients * cp.cpm_array(list(assignments.values())))
+    return objective
+
+
+def build_cp_model(
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    forced_pair: Tuple[int, int] = None,
+    name_prefix: str = "",
+) -> Tuple[cp.Model, Dict[Tuple[int, int], cp.boolvar], List]:
+    """Build the CP assignment model over the eligible MA/client pairs.
+
+    Args:
+        cost_matrix: Integer (#MA x #clients) objective coefficient per pair.
+        eligible: Boolean (#MA x #clients) mask of pairs that may be assigned.
+        unassigned_cost: Objective contribution of a single unassigned client.
+        forced_pair: Optional (MA index, client index) that must be assigned.
+        name_prefix: Prefix for the variable names, needed when several of
+            these models are combined into one (cpmpy identifies variables by name).
+
+    Returns:
+        The model, the assignment variables keyed by (MA index, client index)
+        and the per-client "unassigned" indicator variables.
+    """
+    model = cp.Model()
+    assignments = {}
+    n_mas, n_clients = eligible.shape
+
+    # Create decision variables only for eligible pairs
+    employee_vars = [[] for _ in range(n_mas)]
+    client_vars = [[] for _ in range(n_clients)]
+    for i, j in zip(*np.nonzero(eligible)):
+        i, j = int(i), int(j)
+        # Define a binary variable for this assignment
+        assignments[(i, j)] = cp.boolvar(name=f"{name_prefix}assign_E{i}_C{j}")
+        assignments[(i, j)].set_description(f"E{i} is assigned to C{j}")
+        employee_vars[i].append(assignments[(i, j)])
+        client_vars[j].append(assignments[(i, j)])
+
+    # Create binary variables to represent unassigned clients
+    unassigned_clients = []
+    for j in range(n_clients):
+        unassigned_var = cp.boolvar(name=f"{name_prefix}unassigned_C{j}")
+        unassigned_var.set_description(f"C{j} is not assigned")
+        unassigned_clients.append(unassigned_var)
+
+    # Primary Objective: Minimize the number of unassigned clients
+    for j in range(n_clients):
+        model += [unassigned_clients[j] == 1 - sum(client_vars[j])]
+
+    # Soft objectives: weighted, normalised pair costs
+    model.minimize(cp_objective(cost_matrix, unassigned_cost, assignments, unassigned_clients))
+
+    # Constraints: Each employee and client can only be assigned once
+    # Each employee can only be assigned to one client
+    for i in range(n_mas):
+        model += [sum(employee_vars[i]) <= 1]
+
+    # Each client can only be assigned to one employee
+    for j in range(n_clients):
+        model += [sum(client_vars[j]) <= 1]
+
+    if forced_pair is not None:
+        model += [assignments[forced_pair] == 1]
+
+    return model, assignments, unassigned_clients
@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List
+
+from feature_retrieval.qualifications import qualification_registry
+
+
+def _index_map(values: Iterable) -> Dict:
+    """Map each distinct value to a dense index in order of first appearance."""
+    index_map = {}
+    for value in values:
+        if value not in index_map:
+            index_map[value] = len(index_map)
+    return index_map
+
+
+def _dates(values: pd.Series) -> np.ndarray:
+    """Convert a column of dates to day precision, NaT where missing."""
+    return pd.to_datetime(values.reset_index(drop=True)).to_numpy(dtype="datetime64[D]")
+
+
+def _date_string(value: np.datetime64) -> str | None:
+    return None if np.isnat(value) else str(value)
+
+
+@dataclass(frozen=True)
+class DayDataset:
+    """Typed, columnar MA and client data of one planning day.
+
+    MAs, clients and schools are integer-indexed: MA `i` is row `i` and
+    client `j` is column `j` of every pair matrix, schools are referenced by
+    their position in `school_ids`. Qualifications are the bitmasks of
+    `qualification_registry`.
+
+    The school and experience axes cover all clients of the day, including
+    the ones removed by `select()`, so that the MA records keep the commute
+    times and experience they had before filtering.
+    """
+
+    ma_ids: List[str]
+    ma_names: List[str]
+    ma_qualifications: np.ndarray
+    # (#MA, 2) start and end of the MA's working hours as float hours
+    ma_availability: np.ndarray
+    ma_available_until: np.ndarray
+
+    client_ids: List[str]
+    client_names: List[str]
+    client_qualifications: np.ndarray
+    # (#clients, 2) start and end of today's timetable as float hours, NaN without one
+    client_time_window: np.ndarray
+    client_priority: np.ndarray
+    client_available_until: np.ndarray
+    # Position of the client's school in `school_ids`, -1 without a school
+    client_school: np.ndarray
+    client_school_names: List[str]
+
+    school_ids: List[str]
+    # (#MA, #schools) commute minutes, NaN where the school is out of reach
+    travel_time: np.ndarray
+    # (#MA, #schools) days the MA worked at the school, 0 without experience
+    school_experience: np.ndarray
+
+    experience_client_ids: List[str]
+    # (#MA, #experience clients) days the MA worked with the client, 0 without experience
+    client_experience: np.ndarray
+    # Position of every client in `experience_client_ids`
+    client_experience_index: np.ndarray
+
+    @property
+    def n_mas(self) -> int:
+        return len(self.ma_ids)
+
+    @property
+    def n_clients(self) -> int:
+        return len(self.client_ids)
+
+    @classmethod
+    def from_frames(cls, mas_df: pd.DataFrame, clients_df: pd.DataFrame) -> "DayDataset":
+        """Convert the tables of `aggregate_ma_features` and `aggregate_client_features`.
+
+        Expects the `name` and `available_until` columns added by
+        `build_day_dataset` and the `school_name` column of the clients.
+        """
+        client_ids = clients_df["id"].tolist()
+        schools = clients_df["school"].tolist()
+        school_index = _index_map(school for school in schools if school is not None)
+        experience_index = _index_map(client_ids)
+
+        # Collect the MA dictionaries first, they may name schools or clients of other tables
+        commutes, school_days, client_days = [], [], []
+        for i, (time_to_school, sch_experience, cl_experience) in enumerate(
+            zip(mas_df["timeToSchool"], mas_df["school_experience"], mas_df["cl_experience"])
+        ):
+            commutes.extend((i, school_index.setdefault(school, len(school_index)), minutes)
+                            for school, minutes in time_to_school.items())
+            school_days.extend((i, school_index.setdefault(school, len(school_index)), days)
+                               for school, days in sch_experience.items())
+            client_days.extend((i, experience_index.setdefault(client_id, len(experience_index)), days)
+                               for client_id, days in cl_experience.items())
+
+        n_mas = len(mas_df)
+        travel_time = np.full((n_mas, len(school_index)), np.nan)
+        school_experience = np.zeros((n_mas, len(school_index)))
+        client_experience = np.zeros((n_mas, len(experience_index)))
+        for matrix, entries in ((travel_time, commutes), (school_experience, school_days), (client_experience, client_days)):
+            for i, k, value in entries:
+                matrix[i, k] = value
+
+        return cls(
+            ma_ids=mas_df["id"].tolist(),
+            ma_names=mas_df["name"].tolist(),
+            ma_qualifications=mas_df["qualifications"].to_numpy(dtype=np.int64),
+            ma_availability=np.array(mas_df["availability"].tolist(), dtype=float).reshape(n_mas, 2),
+            ma_available_until=_dates(mas_df["available_until"]),
+            client_ids=client_ids,
+            client_names=clients_df["name"].tolist(),
+            client_qualifications=clients_df["neededQualifications"].to_numpy(dtype=np.int64),
+            client_time_window=np.array(
+                [time_window if time_window else (np.nan, np.nan) for time_window in clients_df["timeWindow"]],
+                dtype=float,
+            ).reshape(len(client_ids), 2),
+            client_priority=clients_df["priority"].to_numpy(dtype=np.int64),
+            client_available_until=_dates(clients_df["available_until"]),
+            client_school=np.array([school_index.get(school, -1) for school in schools], dtype=np.int64),
+            client_school_names=clients_df["school_name"].tolist(),
+            school_ids=list(school_index),
+            travel_time=travel_time,
+            school_experience=school_experience,
+            experience_client_ids=list(experience_index),
+            client_experience=client_experience,
+            client_experience_index=np.array([experience_index[client_id] for client_id in client_ids], dtype=np.int64),
+        )
+
+    def select(self, ma_rows: np.ndarray, client_rows: np.ndarray) -> "DayDataset":
+        """The dataset restricted to some MAs and clients (boolean masks or positions)."""
+        ma_rows = np.flatnonzero(ma_rows) if np.asarray(ma_rows).dtype == bool else np.asarray(ma_rows, dtype=np.int64)
+        client_rows = (
+            np.flatnonzero(client_rows) if np.asarray(client_rows).dtype == bool else np.asarray(client_rows, dtype=np.int64)
+        )
+        return replace(
+            self,
+            ma_ids=[self.ma_ids[i] for i in ma_rows],
+            ma_names=[self.ma_names[i] for i in ma_rows],
+            ma_qualifications=self.ma_qualifications[ma_rows],
+            ma_availability=self.ma_availability[ma_rows],
+            ma_available_until=self.ma_available_until[ma_rows],
+            client_ids=[self.client_ids[j] for j in client_rows],
+            client_names=[self.client_names[j] for j in client_rows],
+            client_qualifications=self.client_qualifications[client_rows],
+            client_time_window=self.client_time_window[client_rows],
+            client_priority=self.client_priority[client_rows],
+            client_available_until=self.client_available_until[client_rows],
+            client_school=self.client_school[client_rows],
+            client_school_names=[self.client_school_names[j] for j in client_rows],
+            travel_time=self.travel_time[ma_rows],
+            school_experience=self.school_experience[ma_rows],
+            client_experience=self.client_experience[ma_rows],
+            client_experience_index=self.client_experience_index[client_rows],
+        )
+
+    def ma_record(self, i: int) -> Dict:
+        """MA `i` in the shape of the frontend payload, see `ma_records`."""
+        travel_time = self.travel_time[i]
+        return {
+            "id": self.ma_ids[i],
+            "qualifications": qualification_registry.names(self.ma_qualifications[i]),
+            "cl_experience": {
+                self.experience_client_ids[k]: int(self.client_experience[i, k])
+                for k in np.flatnonzero(self.client_experience[i])
+            },
+            "school_experience": {
+                self.school_ids[s]: int(self.school_experience[i, s]) for s in np.flatnonzero(self.school_experience[i])
+            },
+            "timeToSchool": {self.school_ids[s]: int(travel_time[s]) for s in np.flatnonzero(~np.isnan(travel_time))},
+            "availability": (float(self.ma_availability[i, 0]), float(self.ma_availability[i, 1])),
+            "name": self.ma_names[i],
+            "available_until": _date_string(self.ma_available_until[i]),
+        }
+
+    def client_record(self, j: int) -> Dict:
+        """Client `j` in the shape of the frontend payload, see `client_records`."""
+        time_window = self.client_time_window[j]
+        school = self.client_school[j]
+        return {
+            "id": self.client_ids[j],
+            "neededQualifications": qualification_registry.names(self.client_qualifications[j]),
+            "timeWindow": None if np.isnan(time_window).any() else (float(time_window[0]), float(time_window[1])),
+            "priority": int(self.client_priority[j]),
+            "school": self.school_ids[school] if school >= 0 else None,
+            "name": self.client_names[j],
+            "school_name": self.client_school_names[j],
+            "available_until": _date_string(self.client_available_until[j]),
+        }
+
+    def ma_records(self) -> List[Dict]:
+        """MA dictionaries as sent to the frontend (`output["mas"]`), dates as YYYY-MM-DD."""
+        return [self.ma_record(i) for i in range(self.n_mas)]
+
+    def client_records(self) -> List[Dict]:
+        """Client dictionaries as sent to the frontend (`output["clients"]`), dates as YYYY-MM-DD."""
+        return [self.client_record(j) for j in range(self.n_clients)]
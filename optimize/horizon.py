@@ -0,0 +1,330 @@
+import cpmpy as cp
+import logging
+import numpy as np
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from optimize.cp_model import build_cp_model, cp_objective
+from optimize.optimizer import Optimizer
+from optimize.SoftConstraintHandler import scaling_factor
+from optimize.solver_params import assignment_result, cp_result, cp_solve_status, merge_status
+
+logger = logging.getLogger(__name__)
+
+# "parallel": independent days, "sequential": day by day with continuity, "joint": one model for all days
+HORIZON_MODES = ("parallel", "sequential", "joint")
+
+# Objective reduction for an MA/client pair that is kept from one day to the next, on the scale of DEFAULT_WEIGHTS
+DEFAULT_CONTINUITY_WEIGHT = 100
+
+# Passes over all days when improving a horizon plan day by day before the joint solve
+IMPROVEMENT_ROUNDS = 10
+
+# Seconds for all solves of one horizon, well below the cache's COMPUTE_LOCK_TTL
+HORIZON_TIME_BUDGET = 5 * 60
+
+
+def _id_pairs(optimizer: Optimizer, pairs: List[Tuple[int, int]]) -> set:
+    ma_ids = optimizer.dataset.ma_ids
+    client_ids = optimizer.dataset.client_ids
+    return {(ma_ids[i], client_ids[j]) for i, j in pairs}
+
+
+def continuity_mask(previous: Optimizer, previous_pairs: List[Tuple[int, int]], current: Optimizer) -> np.ndarray:
+    """Eligible (#MA x #clients) pairs of `current` that repeat an MA/client assignment of the previous day."""
+    kept = _id_pairs(previous, previous_pairs)
+    mask = np.zeros(current.eligible.shape, dtype=bool)
+    for (ma_id, client_id) in kept:
+        i = current.ma_id_index_mapping.get(ma_id)
+        j = current.client_id_index_mapping.get(client_id)
+        if i is not None and j is not None:
+            mask[i, j] = True
+    return mask & current.eligible
+
+
+def _count_kept(days: List[Optimizer], follows: List[bool], plans: List[List[Tuple[int, int]]]) -> int:
+    """Number of assigned pairs that repeat an MA/client pair of the directly preceding day."""
+    kept = 0
+    for d in range(1, len(days)):
+        if not follows[d]:
+            continue
+        mask = continuity_mask(days[d - 1], plans[d - 1], days[d])
+        kept += sum(bool(mask[pair]) for pair in plans[d])
+    return kept
+
+
+def _day_objective(optimizer: Optimizer, pairs: List[Tuple[int, int]]) -> int:
+    unassigned = optimizer.dataset.n_clients - len(pairs)
+    return int(optimizer.unassigned_cost) * unassigned + sum(int(optimizer.cost_matrix[pair]) for pair in pairs)
+
+
+def _solve_day(optimizer: Optimizer, cost_matrix: np.ndarray, hint: np.ndarray = None, deadline: float = None):
+    """Solve one day with the given costs, stopping at `deadline`; returns (pairs, objective, status) or None."""
+    if optimizer.solver == "assignment":
+        return assignment_result(cost_matrix, optimizer.eligible, optimizer.unassigned_cost)
+
+    model, assignments, _ = build_cp_model(cost_matrix, optimizer.eligible, optimizer.unassigned_cost)
+    cp_solver = cp.SolverLookup.get("ortools", model)
+    if hint is not None:
+        # Warm start from the pairs kept from the previous day
+        cp_solver.solution_hint(list(assignments.values()), [bool(hint[pair]) for pair in assignments])
+    found = cp_solver.solve(**optimizer.params.solve_kwargs(deadline))
+    return cp_result(cp_solver, found, assignments, cost_matrix, optimizer.eligible, optimizer.unassigned_cost)
+
+
+def _solve_parallel(days: List[Optimizer], max_workers: int = None, deadline: float = None):
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(
+            executor.map(lambda optimizer: _solve_day(optimizer, optimizer.cost_matrix, deadline=deadline), days)
+        )
+    if any(result is None for result in results):
+        return None
+    return [(pairs, status) for pairs, _, status in results]
+
+
+def _solve_sequential(days: List[Optimizer], bonus: int, follows: List[bool], deadline: float = None):
+    results = []
+    for d, optimizer in enumerate(days):
+        kept = continuity_mask(days[d - 1], results[d - 1][0], optimizer) if follows[d] else None
+        cost_matrix = optimizer.cost_matrix if kept is None else optimizer.cost_matrix - bonus * kept
+        result = _solve_day(optimizer, cost_matrix, hint=kept, deadline=deadline)
+        if result is None:
+            return None
+        results.append((result[0], result[2]))
+    return results
+
+
+def _horizon_objective(
+    days: List[Optimizer], follows: List[bool], plans: List[List[Tuple[int, int]]], bonus: int
+) -> int:
+    day_objectives = sum(_day_objective(optimizer, pairs) for optimizer, pairs in zip(days, plans))
+    return day_objectives - bonus * _count_kept(days, follows, plans)
+
+
+def _improve(
+    days: List[Optimizer],
+    bonus: int,
+    follows: List[bool],
+    results: List,
+    max_rounds: int = IMPROVEMENT_ROUNDS,
+    deadline: float = None,
+):
+    """Re-solve one day at a time against the plans of both neighbouring days until nothing improves.
+
+    Every step solves a single day with the continuity reward towards the
+    previous and the next day and keeps the new plan only if the horizon
+    objective goes down, so the result is never worse than `results`.
+    Stops early once `deadline` (a `time.monotonic()` value) has passed.
+    """
+    results = list(results)
+    plans = [pairs for pairs, _ in results]
+    objective = _horizon_objective(days, follows, plans, bonus)
+    for _ in range(max_rounds):
+        improved = False
+        for d, optimizer in enumerate(days):
+            if deadline is not None and time.monotonic() >= deadline:
+                return results
+            kept = np.zeros(optimizer.eligible.shape, dtype=int)
+            if follows[d]:
+                kept += continuity_mask(days[d - 1], plans[d - 1], optimizer)
+            if d + 1 < len(days) and follows[d + 1]:
+                kept += continuity_mask(days[d + 1], plans[d + 1], optimizer)
+            hint = np.zeros(optimizer.eligible.shape, dtype=bool)
+            for pair in plans[d]:
+                hint[pair] = True
+            result = _solve_day(optimizer, optimizer.cost_matrix - bonus * kept, hint=hint, deadline=deadline)
+            if result is None:
+                continue
+            candidate = plans[:d] + [result[0]] + plans[d + 1:]
+            candidate_objective = _horizon_objective(days, follows, candidate, bonus)
+            if candidate_objective < objective:
+                plans, objective, improved = candidate, candidate_objective, True
+                results[d] = (result[0], result[2])
+        if not improved:
+            break
+    return results
+
+
+def _solve_joint(
+    days: List[Optimizer],
+    bonus: int,
+    follows: List[bool],
+    hint: List[List[Tuple[int, int]]] = None,
+    deadline: float = None,
+):
+    """One CP model over all days with a continuity indicator per repeated MA/client pair."""
+    model = cp.Model()
+    objective = 0
+    day_assignments = []
+    day_unassigned = []
+    for d, optimizer in enumerate(days):
+        day_model, assignments, unassigned_clients = build_cp_model(
+            optimizer.cost_matrix, optimizer.eligible, optimizer.unassigned_cost, name_prefix=f"D{d}_"
+        )
+        model += day_model.constraints
+        objective = objective + cp_objective(
+            optimizer.cost_matrix, optimizer.unassigned_cost, assignments, unassigned_clients
+        )
+        day_assignments.append(assignments)
+        day_unassigned.append(unassigned_clients)
+
+    # (kept indicator, previous day's variable, current day's variable)
+    kept_vars = []
+    for d in range(1, len(days)):
+        if not follows[d]:
+            continue
+        previous_vars = {}
+        ma_ids = days[d - 1].dataset.ma_ids
+        client_ids = days[d - 1].dataset.client_ids
+        for (i, j), var in day_assignments[d - 1].items():
+            previous_vars.setdefault((ma_ids[i], client_ids[j]), var)
+        ma_ids = days[d].dataset.ma_ids
+        client_ids = days[d].dataset.client_ids
+        for (i, j), var in day_assignments[d].items():
+            previous_var = previous_vars.get((ma_ids[i], client_ids[j]))
+            if previous_var is not None:
+                kept = cp.boolvar(name=f"keep_D{d}_E{i}_C{j}")
+                model += [kept <= previous_var, kept <= var]
+                kept_vars.append((kept, previous_var, var))
+    if kept_vars:
+        objective = objective - bonus * cp.sum([kept for kept, _, _ in kept_vars])
+    model.minimize(objective)
+
+    cp_solver = cp.SolverLookup.get("ortools", model)
+    if hint is not None:
+        # A complete hint, so CP-SAT starts from the given plan and never returns a worse one
+        variables, values = [], []
+        chosen_values = {}
+        for assignments, unassigned_clients, pairs in zip(day_assignments, day_unassigned, hint):
+            chosen = set(pairs)
+            for pair, var in assignments.items():
+                chosen_values[var.name] = pair in chosen
+                variables.append(var)
+                values.append(pair in chosen)
+            assigned_clients = {j for _, j in chosen}
+            variables.extend(unassigned_clients)
+            values.extend(j not in assigned_clients for j in range(len(unassigned_clients)))
+        for kept, previous_var, var in kept_vars:
+            variables.append(kept)
+            values.append(chosen_values[previous_var.name] and chosen_values[var.name])
+        cp_solver.solution_hint(variables, values)
+    found = cp_solver.solve(**days[0].params.solve_kwargs(deadline))
+    if not found:
+        return None, cp_solver
+    ort_solver = cp_solver.ort_solver
+    results = []
+    for assignments in day_assignments:
+        results.append([pair for pair, var in assignments.items() if ort_solver.value(cp_solver.solver_var(var)) == 1])
+    return results, cp_solver
+
+
+def solve_horizon(
+    days: List[Optimizer],
+    mode: str = "joint",
+    continuity_weight: int = DEFAULT_CONTINUITY_WEIGHT,
+    max_workers: int = None,
+    time_budget: float = HORIZON_TIME_BUDGET,
+    follows_previous: List[bool] = None,
+) -> Dict | None:
+    """Plan several consecutive days, preferring to keep the same MA with the same client.
+
+    Every day keeps its own objective; each MA/client pair that is also
+    assigned on the directly preceding day lowers the horizon objective by
+    `continuity_weight` (scaled like the soft constraint weights). Days that
+    do not follow each other, e.g. around a day that is not planned, get no
+    continuity reward.
+
+    Modes:
+        "parallel": days are solved independently and concurrently; the
+            continuity of the result is reported but not optimised.
+        "sequential": days are solved in order, each one preferring the
+            previous day's pairs and warm-started from them. Works with both
+            solvers and is exact per day, but greedy over the horizon.
+        "joint": the sequential plan is improved by re-solving one day at a
+            time against both neighbouring days, then refined by one CP-SAT
+            model over all days with a continuity indicator per repeated
+            pair, warm-started from that plan.
+
+    Args:
+        days: One optimizer per day, `create_model()` already called.
+        mode: One of `HORIZON_MODES`.
+        continuity_weight: Reward per kept MA/client pair, 0 disables it.
+        max_workers: Threads for the parallel mode.
+        time_budget: Seconds for all solves together, None for no limit. Every
+            solve is capped to the time that is left, improvement passes stop
+            and the joint model is skipped once it is used up; a day solve
+            that runs out of time falls back to the exact day optimum.
+        follows_previous: Per day, whether it directly follows the day before
+            it in `days`; the first entry is ignored. Default: all days are
+            consecutive.
+
+    Returns:
+        A dictionary with `days`, one `{"pairs", "objective", "status"}` per
+        day (the day objective without continuity; the status of the solve
+        that produced the day), the number of `kept` pairs, the horizon
+        `objective` (sum of the days minus the continuity reward, in every
+        mode) and its `status`; None if a day has no solution.
+    """
+    if mode not in HORIZON_MODES:
+        raise ValueError(f"Unknown horizon mode '{mode}', expected one of {HORIZON_MODES}")
+    if mode == "joint" and any(optimizer.solver != "cpsat" for optimizer in days):
+        raise ValueError("The joint horizon mode needs the 'cpsat' solver")
+    bonus = int(continuity_weight) * scaling_factor
+    follows = [d > 0 and (follows_previous is None or bool(follows_previous[d])) for d in range(len(days))]
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    if mode == "parallel":
+        results = _solve_parallel(days, max_workers, deadline)
+    else:
+        results = _solve_sequential(days, bonus, follows, deadline)
+    if results is None:
+        logger.info("No feasible solution found.")
+        print("No feasible solution found.")
+        return None
+
+    horizon_status = None
+    if mode == "joint" and any(follows) and bonus:
+        # The joint model's bound is weak, so it mostly refines a good starting plan
+        results = _improve(days, bonus, follows, results, deadline=deadline)
+        plans = [pairs for pairs, _ in results]
+        joint, cp_solver = None, None
+        if deadline is None or time.monotonic() < deadline:
+            joint, cp_solver = _solve_joint(days, bonus, follows, hint=plans, deadline=deadline)
+        if joint is not None and (
+            _horizon_objective(days, follows, joint, bonus) <= _horizon_objective(days, follows, plans, bonus)
+        ):
+            horizon_status = cp_solve_status(cp_solver)
+            results = [(pairs, horizon_status) for pairs in joint]
+        else:
+            # Keep the day-by-day plan if the joint model found nothing better within the limits
+            logger.info("Joint horizon model found no better solution, keeping the day-by-day plan.")
+            print("Joint horizon model found no better solution, keeping the day-by-day plan.")
+
+    plans = [pairs for pairs, _ in results]
+    kept = _count_kept(days, follows, plans)
+    day_objectives = [_day_objective(optimizer, pairs) for optimizer, pairs in zip(days, plans)]
+    objective = sum(day_objectives) - bonus * kept
+
+    if horizon_status is None:
+        if not any(follows) or bonus == 0:
+            # Without continuity the days are independent and their optima add up
+            horizon_status = merge_status([status for _, status in results], objective)
+        else:
+            # Not optimised for the horizon as a whole, so there is no bound
+            horizon_status = {
+                "status": "FEASIBLE",
+                "objective_bound": None,
+                "optimality_gap": None,
+                "proven_optimal": False,
+            }
+
+    return {
+        "days": [
+            {"pairs": pairs, "objective": day_objective, "status": status}
+            for (pairs, status), day_objective in zip(results, day_objectives)
+        ],
+        "kept": kept,
+        "objective": objective,
+        "status": horizon_status,
+    }
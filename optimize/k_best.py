@@ -0,0 +1,137 @@
+import heapq
+import cpmpy as cp
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from typing import Dict, List, Set, Tuple
+
+from optimize.cp_model import build_cp_model
+from optimize.solver_params import DEFAULT_SOLVER_PARAMS, SolverParams, cp_solve_status
+
+# Client choice meaning "leave the client unassigned"
+UNASSIGNED = -1
+
+
+def _client_cost_matrix(cost_matrix: np.ndarray, eligible: np.ndarray, unassigned_cost: int) -> np.ndarray:
+    """(#clients x (#MA + #clients)) costs: one column per MA, then one "unassigned" column per client."""
+    n_mas, n_clients = cost_matrix.shape
+    costs = np.full((n_clients, n_mas + n_clients), np.inf)
+    costs[:, :n_mas] = np.where(eligible, cost_matrix, np.inf).T
+    costs[np.arange(n_clients), n_mas + np.arange(n_clients)] = unassigned_cost
+    return costs
+
+
+def _solve_partition(
+    base_costs: np.ndarray,
+    cost_matrix: np.ndarray,
+    fixed: Dict[int, int],
+    forbidden: Set[Tuple[int, int]],
+) -> Tuple[List[int], float] | None:
+    """Best client choices with some choices fixed and others forbidden, or None."""
+    n_mas = cost_matrix.shape[0]
+    costs = base_costs.copy()
+    for j, choice in fixed.items():
+        column = n_mas + j if choice == UNASSIGNED else choice
+        value = base_costs[j, column] if choice == UNASSIGNED else cost_matrix[choice, j]
+        costs[:, column] = np.inf
+        costs[j, :] = np.inf
+        costs[j, column] = value
+    for j, choice in forbidden:
+        costs[j, n_mas + j if choice == UNASSIGNED else choice] = np.inf
+
+    try:
+        rows, cols = linear_sum_assignment(costs)
+    except ValueError:
+        # No complete choice without an infinite cost
+        return None
+    choices = [UNASSIGNED] * costs.shape[0]
+    for j, column in zip(rows, cols):
+        choices[j] = int(column) if column < n_mas else UNASSIGNED
+    return choices, float(costs[rows, cols].sum())
+
+
+def k_best_assignments(
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    k: int,
+    forced_pair: Tuple[int, int] = None,
+) -> List[Tuple[List[Tuple[int, int]], int]]:
+    """The k best distinct assignment plans via Murty's ranking.
+
+    Every plan is a choice per client: one of its eligible MAs or
+    "unassigned". After a plan is taken from the queue, its search space is
+    split into disjoint parts that each fix a prefix of its choices and forbid
+    the next one; the best plan of every part is found with one linear
+    assignment solve.
+
+    Returns:
+        Up to k `(pairs, objective)` tuples ordered by objective, with the
+        same pair order and objective values as `solve_assignment`.
+    """
+    base_costs = _client_cost_matrix(cost_matrix, eligible, unassigned_cost)
+    fixed = {forced_pair[1]: forced_pair[0]} if forced_pair is not None else {}
+
+    ranked = []
+    counter = 0
+    first = _solve_partition(base_costs, cost_matrix, fixed, set())
+    queue = [] if first is None else [(first[1], counter, first[0], fixed, frozenset())]
+    while queue and len(ranked) < k:
+        objective, _, choices, fixed, forbidden = heapq.heappop(queue)
+        pairs = sorted((choice, j) for j, choice in enumerate(choices) if choice != UNASSIGNED)
+        ranked.append((pairs, int(round(objective))))
+
+        prefix = dict(fixed)
+        for j, choice in enumerate(choices):
+            if j in fixed:
+                continue
+            part_forbidden = forbidden | {(j, choice)}
+            result = _solve_partition(base_costs, cost_matrix, prefix, part_forbidden)
+            if result is not None:
+                counter += 1
+                heapq.heappush(queue, (result[1], counter, result[0], dict(prefix), part_forbidden))
+            prefix[j] = choice
+    return ranked
+
+
+def k_best_cp(
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    k: int,
+    forced_pair: Tuple[int, int] = None,
+    params: SolverParams = None,
+) -> List[Tuple[List[Tuple[int, int]], int, Dict]]:
+    """The k best distinct plans from one persistent CP-SAT session.
+
+    After each solve a no-good constraint excludes exactly the plan just
+    found, and the next solve is warm-started from it. `params` limits every
+    single solve. A plan that is not proven optimal among the remaining ones
+    may rank below a plan that was not found yet, so the ranking stops after
+    it.
+
+    Returns:
+        Up to k `(pairs, objective, status)` tuples ordered by objective, with
+        the status of the solve that found the plan (see `solve_status`).
+    """
+    eligible = eligible.copy()
+    if forced_pair is not None:
+        eligible[forced_pair] = True
+    model, assignments, _ = build_cp_model(cost_matrix, eligible, unassigned_cost, forced_pair=forced_pair)
+    solver = cp.SolverLookup.get("ortools", model)
+    variables = list(assignments.values())
+    solve_kwargs = (params or DEFAULT_SOLVER_PARAMS).solve_kwargs()
+
+    ranked = []
+    while len(ranked) < k and solver.solve(**solve_kwargs):
+        chosen = [pair for pair, var in assignments.items() if var.value()]
+        status = cp_solve_status(solver)
+        ranked.append((chosen, solver.objective_value(), status))
+        if not status["proven_optimal"]:
+            break
+
+        chosen_vars = [assignments[pair] for pair in chosen]
+        others = [var for pair, var in assignments.items() if not var.value()]
+        # At least one chosen pair must go or one other pair must come in
+        solver += cp.sum(chosen_vars) - cp.sum(others) <= len(chosen_vars) - 1
+        solver.solution_hint(variables, [var.value() for var in variables])
+    return ranked
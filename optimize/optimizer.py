@@ -1,28 +1,79 @@
 import cpmpy as cp
+import numpy as np
 import pandas as pd
-from optimize.utils.has_required_qualifications import has_required_qualifications
-from optimize.SoftConstraintHandler import SoftConstrainedHandler
+from optimize.day_dataset import DayDataset
+from optimize.precompute import extract_feature_arrays, eligibility_mask
+from optimize.cp_model import build_cp_model
+from optimize.k_best import k_best_assignments, k_best_cp
+from optimize.SoftConstraintHandler import SoftConstrainedHandler, resolve_weights
+from optimize.solver_params import (
+    DEFAULT_SOLVER_PARAMS, SolverParams, assignment_result, cp_result, exact_status, solve_cp,
+)
 import logging
-from typing import Dict
+from typing import Dict, List, Tuple
 from optimize.utils.base_availability import base_availability
+from optimize.utils.has_required_qualifications import has_required_qualifications
 
 logger = logging.getLogger(__name__)
 
+# "cpsat": cpmpy model solved with OR-Tools, "assignment": min-cost linear assignment
+SOLVERS = ("cpsat", "assignment")
+
+
+def _remaining(ids: List[str], used: List[int]) -> List[str]:
+    """IDs in order without one occurrence per used index, like repeated `list.remove`."""
+    to_remove = {}
+    for index in used:
+        to_remove[ids[index]] = to_remove.get(ids[index], 0) + 1
+    remaining = []
+    for id_value in ids:
+        if to_remove.get(id_value, 0) > 0:
+            to_remove[id_value] -= 1
+        else:
+            remaining.append(id_value)
+    return remaining
+
+
+def log_solve_status(status: Dict) -> None:
+    if status["proven_optimal"]:
+        logger.info("Optimal solution found!")
+        print("Optimal solution found!")
+    else:
+        message = f"Solution found ({status['status']}, optimality gap {status['optimality_gap']:.4%})"
+        logger.info(message)
+        print(message)
+
 
 class Optimizer:
 
     def __init__(
-        self, employees: pd.DataFrame, clients: pd.DataFrame, forced_ma: str = None, forced_client: str = None
+        self, dataset: DayDataset, forced_ma: str = None, forced_client: str = None,
+        eligible_stats: bool = False, solver: str = "cpsat",
+        params: SolverParams = None, weights: Dict[str, int] = None,
     ):
         # Define variables for employee self.assignments and client unassignment indicators
         self.assignments = {}
         self.unassigned_clients = []
         # Model instance
         self.model = cp.Model()
-        self.employees = employees
-        self.clients = clients
+        self.dataset = dataset
         self.forced_ma = forced_ma
         self.forced_client = forced_client
+        # Normalise objective features over feasible pairs only instead of all pairs
+        self.eligible_stats = eligible_stats
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}', expected one of {SOLVERS}")
+        self.solver = solver
+        # Time limit, workers and gap limit of every CP-SAT solve
+        self.params = params or DEFAULT_SOLVER_PARAMS
+        # Objective weights, missing ones fall back to the defaults
+        self.weights = resolve_weights(weights)
+        # Assigned (MA index, client index) pairs of the last solve
+        self.solution = []
+        # Status, bound and optimality gap of the last solve, see `solve_status`
+        self.solve_status = None
+        # Per-component objective values of the last solve, see `objective_breakdown`
+        self.objective_breakdown = None
         
         self.ma_id_index_mapping = {}
         self.client_id_index_mapping = {}
@@ -31,124 +82,145 @@ class Optimizer:
 
         self.learner_dataset = {}
 
-        # Create decision variables and filter based on eligibility
-        for i, emp in self.employees.iterrows():
-            for j, client in self.clients.iterrows():
-                if client["school"] in emp["timeToSchool"] and has_required_qualifications(
-                    emp["qualifications"], client["neededQualifications"]
-                ) or (self.forced_ma and self.forced_client and emp["id"] == self.forced_ma and client["id"] == self.forced_client):
-                    if not client["id"] in self.client_id_index_mapping:
-                        self.client_id_index_mapping[client["id"]] = j
-                    if not emp["id"] in self.ma_id_index_mapping:
-                        self.ma_id_index_mapping[emp["id"]] = i
-                    
-                    # Define a binary variable for this assignment
-                    self.assignments[(i, j)] = cp.boolvar(name=f"assign_E{i}_C{j}")
-                    self.assignments[(i, j)].set_description(
-                        f"E{i} is assigned to C{j}"
-                    )
-                    
-        # Create binary variables to represent unassigned clients
-        for j in range(len(self.clients)):
-            unassigned_var = cp.boolvar(name=f"unassigned_C{j}")
-            unassigned_var.set_description(f"C{j} is not assigned")
-            self.unassigned_clients.append(unassigned_var)
-
-        # Primary Objective: Minimize the number of unassigned clients
-        for j in range(len(self.clients)):
-            self.model += [
-                self.unassigned_clients[j]
-                == 1
-                - sum(
-                    self.assignments[(i, j)]
-                    for i in range(len(self.employees))
-                    if (i, j) in self.assignments
-                )
-            ]
+        # Derive the pair matrices once and eligibility for all pairs at once
+        self.features = extract_feature_arrays(self.dataset)
+        self.eligible = eligibility_mask(self.features)
 
-        soft_constrained_handler = SoftConstrainedHandler(
-            self.employees,
-            self.clients,
-            self.assignments,
-            self.unassigned_clients,
-            self.model,
-        )
-        self.model = soft_constrained_handler.set_up_objectives()
-
-        # Constraints: Each employee and client can only be assigned once
-        # Each employee can only be assigned to one client
-        for i in range(len(self.employees)):
-            self.model += [
-                sum(
-                    self.assignments[(i, j)]
-                    for j in range(len(self.clients))
-                    if (i, j) in self.assignments
-                )
-                <= 1
-            ]
+        for i, emp_id in enumerate(self.dataset.ma_ids):
+            self.ma_id_index_mapping.setdefault(emp_id, i)
+        for j, client_id in enumerate(self.dataset.client_ids):
+            self.client_id_index_mapping.setdefault(client_id, j)
 
-        # Each client can only be assigned to one employee
-        for j in range(len(self.clients)):
-            self.model += [
-                sum(
-                    self.assignments[(i, j)]
-                    for i in range(len(self.employees))
-                    if (i, j) in self.assignments
-                )
-                <= 1
-            ]
-            
+        self.forced_pair = None
         if self.forced_ma and self.forced_client:
             emp_index = self.ma_id_index_mapping.get(self.forced_ma, None)
             client_index = self.client_id_index_mapping.get(self.forced_client, None)
-            if emp_index is None or client_index is None:
-                self.model += [False]
-            self.model += [self.assignments.get((emp_index, client_index), 0) == 1]
+            if emp_index is not None and client_index is not None:
+                self.forced_pair = (emp_index, client_index)
+                self.eligible[self.forced_pair] = True
+
+        self.soft_constrained_handler = SoftConstrainedHandler(
+            self.dataset,
+            weights=self.weights,
+            features=self.features,
+            stats_mask=self.eligible if self.eligible_stats else None,
+        )
+        self.cost_matrix = self.soft_constrained_handler.weighted_cost_matrix()
+        self.unassigned_cost = self.soft_constrained_handler.unassigned_cost()
+
+    def build_model(self):
+        """Build the CP model of the whole day from the cost matrix; `solve_model` does this on first use.
+
+        Sessions and the horizon planner build their own models, so `create_model` stops at the costs.
+        """
+        self.model, self.assignments, self.unassigned_clients = build_cp_model(
+            self.cost_matrix, self.eligible, self.unassigned_cost, forced_pair=self.forced_pair
+        )
 
     def solve_model(self):
-        if self.model.solve(solver="ortools"):
-            logger.info("Optimal solution found!")
-            print("Optimal solution found!")
-            return self.model.objective_value()
+        if self.forced_ma and self.forced_client and self.forced_pair is None:
+            # The forced MA or client is not part of today's dataset
+            result = None
+        elif self.solver == "assignment":
+            result = assignment_result(
+                self.cost_matrix, self.eligible, self.unassigned_cost, forced_pair=self.forced_pair
+            )
         else:
+            if not self.assignments and not self.unassigned_clients:
+                self.build_model()
+            cp_solver, found = solve_cp(self.model, self.params)
+            result = cp_result(
+                cp_solver, found, self.assignments,
+                self.cost_matrix, self.eligible, self.unassigned_cost, forced_pair=self.forced_pair,
+            )
+
+        if result is None:
             logger.info("No feasible solution found.")
             print("No feasible solution found.")
             return None
 
-    def process_results(self):
+        self.solution, objective_value, self.solve_status = result
+        self.objective_breakdown = self.soft_constrained_handler.objective_breakdown(self.solution)
+        log_solve_status(self.solve_status)
+        return objective_value
+
+    def objective_for(self, weights: Dict[str, int] = None) -> Tuple[np.ndarray, int]:
+        """Cost matrix and unassigned cost for other (complete) weights, or the model's own."""
+        if weights is None or weights == self.weights:
+            return self.cost_matrix, self.unassigned_cost
+        handler = self.soft_constrained_handler
+        return handler.weighted_cost_matrix(weights), handler.unassigned_cost(weights)
+
+    def solve_k_best(self, k: int, weights: Dict[str, int] = None) -> List[Dict]:
+        """Return the k best distinct solutions, best first.
+
+        The assignment solver ranks plans with Murty's method, CP-SAT adds a
+        no-good constraint per found plan within one solver session and stops
+        after the first plan that is not proven optimal. Does not change
+        `self.solution`. `weights` (complete, see `resolve_weights`) replaces
+        the model's objective weights for this ranking.
+
+        Returns:
+            A list of dictionaries with the assigned `pairs` (MA index, client
+            index), the `objective` value, its per-component `breakdown` and
+            the solve `status` (see `solve_status`).
+        """
+        if self.forced_ma and self.forced_client and self.forced_pair is None:
+            return []
+        cost_matrix, unassigned_cost = self.objective_for(weights)
+        if self.solver == "assignment":
+            ranked = [
+                (pairs, objective, exact_status(objective))
+                for pairs, objective in k_best_assignments(
+                    cost_matrix, self.eligible, unassigned_cost, k, forced_pair=self.forced_pair
+                )
+            ]
+        else:
+            ranked = k_best_cp(
+                cost_matrix, self.eligible, unassigned_cost, k,
+                forced_pair=self.forced_pair, params=self.params,
+            )
+        return [
+            {
+                "pairs": pairs,
+                "objective": objective,
+                "breakdown": self.soft_constrained_handler.objective_breakdown(pairs, weights),
+                "status": status,
+            }
+            for pairs, objective, status in ranked
+        ]
+
+    def process_results(self, solution: List[Tuple[int, int]] = None, weights: Dict[str, int] = None):
+        """Format a solution (default: the stored one) for the API and caching.
+
+        The objective breakdown uses `weights` if given, the model's weights otherwise.
+        """
+        if solution is None:
+            solution = self.solution
         store_dict = {
             "assigned_pairs": None,
             "unassigned_employees": None,
             "unassigned_clients": None,
             "context": {}
         }
-        assigned_pairs = []
-        unassigned_employees = [self.employees.iloc[i]["id"] for i in range(len(self.employees))]
-        unassigned_clients = [self.clients.iloc[j]["id"] for j in range(len(self.clients))]
-        for (i, j), var in self.assignments.items():
-            if var.value() == 1:
-                assigned_pairs.append(
-                    {
-                        "ma": self.employees.iloc[i]["id"],
-                        "klient": self.clients.iloc[j]["id"],
-                    }
-                )
-                unassigned_employees.remove(self.employees.iloc[i]["id"])
-                unassigned_clients.remove(self.clients.iloc[j]["id"])
-                print(
-                    f"Employee {self.employees.iloc[i]['id']} assigned to Client {self.clients.iloc[j]['id']}"
-                )
+        ma_ids = self.dataset.ma_ids
+        client_ids = self.dataset.client_ids
+        for i, j in solution:
+            print(f"Employee {ma_ids[i]} assigned to Client {client_ids[j]}")
         
-        store_dict["unassigned_employees"] = [{"id": unassigned_employee} for unassigned_employee in unassigned_employees]
-        store_dict["unassigned_clients"] = [{"id": unassigned_client} for unassigned_client in unassigned_clients]
+        store_dict["unassigned_employees"] = [{"id": ma_id} for ma_id in _remaining(ma_ids, [i for i, _ in solution])]
+        store_dict["unassigned_clients"] = [{"id": client_id} for client_id in _remaining(client_ids, [j for _, j in solution])]
+
+        # Objective contribution of every component, per pair and in total
+        pair_objectives = self.soft_constrained_handler.pair_objectives(solution, weights)
+        store_dict["objective_breakdown"] = self.soft_constrained_handler.objective_breakdown(solution, weights)
 
         assigned_pairs_df = []
-        for assigned_pair in assigned_pairs:
-            ma = assigned_pair["ma"]
-            client = assigned_pair["klient"]
-            ma_index = self.ma_id_index_mapping[ma]
-            client_index = self.client_id_index_mapping[client]
-            pair_df = self.process_employee_client_pair(ma_index, client_index)
+        for position, (i, j) in enumerate(solution):
+            pair_df = self.process_employee_client_pair(
+                self.ma_id_index_mapping[ma_ids[i]], self.client_id_index_mapping[client_ids[j]]
+            )
+            pair_df["objective"] = {objective: int(values[position]) for objective, values in pair_objectives.items()}
             assigned_pairs_df.append(pair_df)
             
         
@@ -165,43 +237,37 @@ class Optimizer:
         Process a single employee-client pair and store their features if they are a valid match.
 
         Args:
-            emp_idx: Index of the employee in the employees DataFrame
-            client_idx: Index of the client in the clients DataFrame
+            emp_idx: Index of the employee in the day dataset
+            client_idx: Index of the client in the day dataset
         """
-        emp = self.employees.iloc[emp_idx]
-        client = self.clients.iloc[client_idx]
-
-        # convert emp["available_until"] to a human readable format, such as 01.01.2025
-        available_until_ma = (
-            emp["available_until"]
-            if emp["available_until"] is not None
-            else "unbekannt"
-        )
-        available_until_client = (
-            client["available_until"]
-            if client["available_until"] is not None
-            else "unbekannt"
-        )
+        dataset = self.dataset
+        school = dataset.client_school[client_idx]
+        time_to_school = dataset.travel_time[emp_idx, school] if school >= 0 else np.nan
+        time_to_school = None if np.isnan(time_to_school) else int(time_to_school)
+        school_experience = dataset.school_experience[emp_idx, school] if school >= 0 else 0
+        client_end = dataset.client_time_window[client_idx, 1]
 
-        if available_until_ma is not None and available_until_client is not None:
-            availability_gap = (available_until_ma - available_until_client).days
-        else:
-            availability_gap = None
+        # Whole days the MA stays free longer than the client needs cover, None if a date is unknown
+        availability_gap = dataset.ma_available_until[emp_idx] - dataset.client_available_until[client_idx]
+        availability_gap = None if np.isnat(availability_gap) else int(availability_gap.astype(int))
 
-        print(f"timeToSchool: {emp['timeToSchool'].get(client['school'], None)}")
+        print(f"timeToSchool: {time_to_school}")
 
         pair_data = {
-            "timeToSchool": emp["timeToSchool"].get(client["school"], None),
-            "cl_experience": emp["cl_experience"].get(client["id"], 0),
-            "school_experience": emp["school_experience"].get(client["school"], 0),
-            "priority": int(client["priority"]),
-            "ma_availability": (emp["availability"][1], client["timeWindow"][1]),
-            "qualifications_met": all(
-                e in emp["qualifications"] for e in client["neededQualifications"]
+            "timeToSchool": time_to_school,
+            "cl_experience": int(dataset.client_experience[emp_idx, dataset.client_experience_index[client_idx]]),
+            "school_experience": int(school_experience),
+            "priority": int(dataset.client_priority[client_idx]),
+            "ma_availability": (
+                float(dataset.ma_availability[emp_idx, 1]),
+                None if np.isnan(client_end) else float(client_end),
+            ),
+            "qualifications_met": has_required_qualifications(
+                int(dataset.ma_qualifications[emp_idx]), int(dataset.client_qualifications[client_idx])
             ),
             "availability_gap": availability_gap,
         }
         
-        pair_data["ma"] = emp["id"]
-        pair_data["klient"] = client["id"]
-        return pair_data
\ No newline at end of file
+        pair_data["ma"] = dataset.ma_ids[emp_idx]
+        pair_data["klient"] = dataset.client_ids[client_idx]
+        return pair_data
@@ -0,0 +1,63 @@
+import numpy as np
+from typing import Dict
+
+from optimize.day_dataset import DayDataset
+
+
+def _days(dates: np.ndarray) -> np.ndarray:
+    """Convert day-precision dates to day numbers (NaN where missing)."""
+    days = dates.astype("int64").astype(float)
+    days[np.isnat(dates)] = np.nan
+    return days
+
+
+def pair_feature_arrays(dataset: DayDataset) -> Dict[str, np.ndarray]:
+    """Date-independent (#MA, #clients) feature matrices.
+
+    Reachability, qualification match, travel time and experience, gathered
+    from the school and experience axes of the dataset.
+    """
+    n_mas = dataset.n_mas
+    # Clients without a school (index -1) point to an appended column that no MA can reach
+    travel_time = np.hstack([dataset.travel_time, np.full((n_mas, 1), np.nan)])[:, dataset.client_school]
+    school_experience = np.hstack([dataset.school_experience, np.zeros((n_mas, 1))])[:, dataset.client_school]
+    reachable = ~np.isnan(travel_time)
+    # Qualified if the client needs no qualification the MA lacks
+    qualified = (dataset.client_qualifications[None, :] & ~dataset.ma_qualifications[:, None]) == 0
+
+    return {
+        "reachable": reachable,
+        "qualified": qualified,
+        "travel_time": np.where(reachable, travel_time, 0.0),
+        "client_experience": dataset.client_experience[:, dataset.client_experience_index],
+        "school_experience": school_experience,
+    }
+
+
+def extract_feature_arrays(dataset: DayDataset) -> Dict[str, np.ndarray]:
+    """Derive the dense NumPy feature arrays of a day dataset, once per model.
+
+    Pairwise features are returned as (#MA, #clients) matrices so that the
+    eligibility mask, the normalisation statistics and the objective
+    coefficients can all be computed with broadcasting instead of lookups
+    per pair.
+    """
+    n_mas = dataset.n_mas
+    n_clients = dataset.n_clients
+    client_priority = dataset.client_priority.astype(float)
+
+    return {
+        **pair_feature_arrays(dataset),
+        "time_window": dataset.ma_availability[:, 1][:, None] - dataset.client_time_window[:, 1][None, :],
+        "priority": np.broadcast_to(client_priority, (n_mas, n_clients)),
+        "availability_gap": _days(dataset.ma_available_until)[:, None] - _days(dataset.client_available_until)[None, :],
+        "client_priority": client_priority,
+        # Experience days as recorded per MA, independent of which clients are still open
+        "client_experience_values": dataset.client_experience[dataset.client_experience > 0],
+        "school_experience_values": dataset.school_experience[dataset.school_experience > 0],
+    }
+
+
+def eligibility_mask(features: Dict[str, np.ndarray]) -> np.ndarray:
+    """MA/client pairs where the school is reachable and all needed qualifications are met."""
+    return features["reachable"] & features["qualified"]
@@ -0,0 +1,339 @@
+import cpmpy as cp
+import logging
+import numpy as np
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from optimize.alternatives import top_k_alternatives
+from optimize.components import find_components
+from optimize.cp_model import build_cp_model, cp_objective
+from optimize.day_dataset import DayDataset
+from optimize.optimizer import Optimizer, log_solve_status
+from optimize.SoftConstraintHandler import resolve_weights
+from optimize.solver_params import SolverParams, assignment_result, cp_result, merge_status
+
+logger = logging.getLogger(__name__)
+
+# Weightings per session whose objective and baseline are kept, e.g. recent slider positions
+WEIGHTS_CACHE_SIZE = 16
+
+# Threads solving the components of one call concurrently, shared by all sessions.
+# CP-SAT and scipy release the GIL while they solve.
+COMPONENT_WORKERS = int(os.getenv("SESSION_COMPONENT_WORKERS", os.cpu_count() or 1))
+_component_executor = ThreadPoolExecutor(max_workers=COMPONENT_WORKERS, thread_name_prefix="session-component")
+
+
+def weights_key(weights: Dict[str, int]) -> tuple:
+    return tuple(sorted(weights.items()))
+
+
+class OptimizerSession:
+    """One model build per day dataset, solved incrementally for forced pairs.
+
+    The eligibility graph is split into its connected components (see
+    `find_components`). They share no MA or client and the objective is a sum
+    over pairs and clients, so the baseline is the sum of the component
+    optima. A forced variant only re-solves the one or two components that
+    contain the forced MA or client, every other component keeps its
+    baseline plan. Components re-solved in the same call are solved
+    concurrently on a shared thread pool and merged in component order.
+
+    Every component's CP model is built and handed to a persistent OR-Tools
+    solver once. Forcing an MA/client pair temporarily fixes every assignment
+    variable of that MA and that client to zero and restores the bounds after
+    the solve, so no constraint is added to the model permanently. The forced
+    pair is then added back with its cost, which also covers pairs that are
+    not eligible on their own. Every forced solve is warm-started with the
+    baseline assignment as a solution hint.
+
+    Objective weights may differ per call. All weightings share the variables
+    and constraints: a solver whose objective belongs to other weights only
+    gets the new objective expression, and the first solve for new weights is
+    warm-started from the most recent baseline.
+
+    `solve()` may be called from several threads at once: every concurrent
+    solve gets its own persistent solver per component from a small pool, and
+    solutions are read from that solver instead of from the shared model
+    variables.
+
+    The time limit of the session's `SolverParams` holds for each call as a
+    whole, not per component; when it stops the search, the best solution
+    found so far is returned together with its optimality gap, and the exact
+    linear assignment if there is none.
+    """
+
+    def __init__(
+        self,
+        dataset: DayDataset,
+        solver: str = "cpsat",
+        params: SolverParams = None,
+        weights: Dict[str, int] = None,
+    ):
+        self.optimizer = Optimizer(dataset, solver=solver, params=params, weights=weights)
+        self.optimizer.create_model()
+        self.solver = solver
+        # Default weights of the session, used when a call passes none
+        self.weights = self.optimizer.weights
+        # (result, per-component results) of the baseline and (cost matrix, unassigned cost) per weights key
+        self.baselines: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._objectives: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._last_baseline = None
+        self._lock = threading.Lock()
+        self._baseline_lock = threading.Lock()
+
+        eligible = self.optimizer.eligible
+        self.components = find_components(eligible)
+        # Component of every MA and client (-1 without any eligible pair) and its index within the component
+        self._ma_component = np.full(eligible.shape[0], -1)
+        self._client_component = np.full(eligible.shape[1], -1)
+        self._ma_local = np.full(eligible.shape[0], -1)
+        self._client_local = np.full(eligible.shape[1], -1)
+        for c, (ma_indices, client_indices) in enumerate(self.components):
+            self._ma_component[ma_indices] = c
+            self._client_component[client_indices] = c
+            self._ma_local[ma_indices] = np.arange(len(ma_indices))
+            self._client_local[client_indices] = np.arange(len(client_indices))
+        # Clients outside every component can never be assigned
+        self._uncovered_clients = eligible.shape[1] - sum(len(client_indices) for _, client_indices in self.components)
+
+        # (model, assignment variables, unassigned indicators) and idle persistent solvers
+        # with the weights key of their current objective, per component
+        self._models = []
+        self._idle_solvers: List[list] = []
+        if solver == "cpsat":
+            for c, (ma_indices, client_indices) in enumerate(self.components):
+                index = np.ix_(ma_indices, client_indices)
+                model = build_cp_model(
+                    self.optimizer.cost_matrix[index], eligible[index], self.optimizer.unassigned_cost,
+                    name_prefix=f"K{c}_",
+                )
+                self._models.append(model)
+                self._idle_solvers.append([(cp.SolverLookup.get("ortools", model[0]), weights_key(self.weights))])
+
+    @property
+    def baseline(self):
+        """Baseline result for the session's default weights, None if not solved yet."""
+        baseline = self.baselines.get(weights_key(self.weights))
+        return None if baseline is None else baseline[0]
+
+    def solve(self, forced_ma: str = None, forced_client: str = None, weights: Dict[str, int] = None):
+        """Solve the baseline or a forced variant and store its solution, status and breakdown on the optimizer.
+
+        Returns:
+            The objective value, or None if the forced MA or client is unknown
+            or no feasible solution was found.
+        """
+        result = self.solve_pairs(forced_ma=forced_ma, forced_client=forced_client, weights=weights)
+        if result is None:
+            return None
+        optimizer = self.optimizer
+        optimizer.solution, objective_value, optimizer.solve_status = result
+        optimizer.objective_breakdown = optimizer.soft_constrained_handler.objective_breakdown(
+            optimizer.solution, self._resolve(weights)
+        )
+        return objective_value
+
+    def solve_pairs(self, forced_ma: str = None, forced_client: str = None, weights: Dict[str, int] = None):
+        """Solve the baseline or a forced variant without touching the optimizer state.
+
+        Args:
+            forced_ma: MA ID of the forced pair, if any.
+            forced_client: Client ID of the forced pair, if any.
+            weights: Objective weights for this solve; missing ones fall back
+                to the defaults, None uses the session's weights.
+
+        Returns:
+            A tuple `(pairs, objective, status)` with the assigned (MA index,
+            client index) pairs and the solve status (see `solve_status`), or
+            None if the forced MA or client is unknown or no feasible solution
+            was found within the limits.
+        """
+        optimizer = self.optimizer
+        forced_pair = None
+        if forced_ma and forced_client:
+            emp_index = optimizer.ma_id_index_mapping.get(forced_ma, None)
+            client_index = optimizer.client_id_index_mapping.get(forced_client, None)
+            if emp_index is None or client_index is None:
+                logger.info("No feasible solution found.")
+                print("No feasible solution found.")
+                return None
+            forced_pair = (emp_index, client_index)
+
+        weights = self._resolve(weights)
+        key = weights_key(weights)
+        baseline = self.baselines.get(key)
+        if baseline is None:
+            # Forced variants reuse the baseline of every component they do not touch
+            with self._baseline_lock:
+                baseline = self.baselines.get(key)
+                if baseline is None:
+                    hints = None if self._last_baseline is None else self._last_baseline[1]
+                    baseline = self._solve(None, weights, hints)
+                    if baseline is not None:
+                        self._remember(self.baselines, key, baseline)
+                        self._last_baseline = baseline
+            if baseline is None:
+                return None
+        if forced_pair is None:
+            return baseline[0]
+
+        result = self._solve(forced_pair, weights, baseline[1])
+        return None if result is None else result[0]
+
+    def _resolve(self, weights: Dict[str, int] = None) -> Dict[str, int]:
+        return self.weights if weights is None else resolve_weights(weights)
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key: tuple, value) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > WEIGHTS_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def objective(self, weights: Dict[str, int] = None):
+        """Cost matrix and unassigned cost for the given weights, computed once per weighting."""
+        key = weights_key(self._resolve(weights))
+        with self._lock:
+            objective = self._objectives.get(key)
+            if objective is not None:
+                self._objectives.move_to_end(key)
+                return objective
+        objective = self.optimizer.objective_for(self._resolve(weights))
+        with self._lock:
+            self._remember(self._objectives, key, objective)
+        return objective
+
+    def _solve(self, forced_pair, weights: Dict[str, int], baseline_parts: List = None):
+        """Solve the baseline (every component) or a forced variant (only the components it touches).
+
+        Returns:
+            The merged `(pairs, objective, status)` and the per-component
+            results, or None if a component has no solution.
+        """
+        cost_matrix, unassigned_cost = self.objective(weights)
+        time_limit = self.optimizer.params.time_limit
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+
+        if forced_pair is None:
+            resolve = range(len(self.components))
+            parts = [None] * len(self.components)
+        else:
+            emp_index, client_index = forced_pair
+            resolve = sorted({int(self._ma_component[emp_index]), int(self._client_component[client_index])} - {-1})
+            parts = list(baseline_parts)
+
+        def solve_component(c: int):
+            hint = None if baseline_parts is None else baseline_parts[c]
+            blocked_ma, blocked_client = self._local_pair(forced_pair, c)
+            return self._solve_component(
+                c, weights, cost_matrix, unassigned_cost, blocked_ma, blocked_client, hint, deadline
+            )
+
+        if len(resolve) > 1:
+            solved = list(_component_executor.map(solve_component, resolve))
+        else:
+            solved = [solve_component(c) for c in resolve]
+        for c, part in zip(resolve, solved):
+            if part is None:
+                logger.info("No feasible solution found.")
+                print("No feasible solution found.")
+                return None
+            parts[c] = part
+
+        result = self._merge(parts, cost_matrix, unassigned_cost, forced_pair)
+        log_solve_status(result[2])
+        return result, parts
+
+    def _local_pair(self, forced_pair, c: int):
+        """Indices of the forced MA and client within component `c`, None for the ones outside of it."""
+        if forced_pair is None:
+            return None, None
+        emp_index, client_index = forced_pair
+        return (
+            int(self._ma_local[emp_index]) if self._ma_component[emp_index] == c else None,
+            int(self._client_local[client_index]) if self._client_component[client_index] == c else None,
+        )
+
+    def _merge(self, parts: List, cost_matrix, unassigned_cost, forced_pair=None):
+        """Combine the per-component results into `(pairs, objective, status)` of the whole day."""
+        pairs = []
+        offset = int(unassigned_cost) * self._uncovered_clients
+        if forced_pair is not None:
+            # The forced client counts as assigned to the forced MA instead of unassigned
+            pairs.append(forced_pair)
+            offset += int(cost_matrix[forced_pair]) - int(unassigned_cost)
+        objective = offset
+        for (ma_indices, client_indices), (local_pairs, local_objective, _) in zip(self.components, parts):
+            pairs.extend((int(ma_indices[i]), int(client_indices[j])) for i, j in local_pairs)
+            objective += int(local_objective)
+        pairs.sort()
+        return pairs, objective, merge_status([status for _, _, status in parts], objective, bound_offset=offset)
+
+    def _solve_component(
+        self, c: int, weights: Dict[str, int], cost_matrix, unassigned_cost,
+        blocked_ma=None, blocked_client=None, hint=None, deadline: float = None,
+    ):
+        """Solve component `c` without the given local MA and client; returns local `(pairs, objective, status)`."""
+        ma_indices, client_indices = self.components[c]
+        index = np.ix_(ma_indices, client_indices)
+        cost_matrix = cost_matrix[index]
+        eligible = self.optimizer.eligible[index]
+        if blocked_ma is not None or blocked_client is not None:
+            eligible = eligible.copy()
+            if blocked_ma is not None:
+                eligible[blocked_ma, :] = False
+            if blocked_client is not None:
+                eligible[:, blocked_client] = False
+        if self.solver != "cpsat":
+            return assignment_result(cost_matrix, eligible, unassigned_cost)
+
+        _, assignments, unassigned_clients = self._models[c]
+        cp_solver, solver_key = self._acquire_solver(c)
+        try:
+            key = weights_key(weights)
+            if solver_key != key:
+                # Same variables and constraints, only the objective changes
+                cp_solver.minimize(cp_objective(cost_matrix, unassigned_cost, assignments, unassigned_clients))
+                solver_key = key
+            if hint is not None:
+                hint_pairs = set(hint[0])
+                cp_solver.solution_hint(list(assignments.values()), [pair in hint_pairs for pair in assignments])
+
+            blocked = [var for (i, j), var in assignments.items() if i == blocked_ma or j == blocked_client]
+            self._set_domain(cp_solver, blocked, 0, 0)
+            try:
+                found = cp_solver.solve(**self.optimizer.params.solve_kwargs(deadline))
+            finally:
+                self._set_domain(cp_solver, blocked, 0, 1)
+            return cp_result(cp_solver, found, assignments, cost_matrix, eligible, unassigned_cost)
+        finally:
+            self._release_solver(c, cp_solver, solver_key)
+
+    def alternatives(self, solution, k: int = 3, weights: Dict[str, int] = None):
+        """Per MA index, the k clients that are cheapest to force, see `top_k_alternatives`."""
+        cost_matrix, unassigned_cost = self.objective(weights)
+        return top_k_alternatives(cost_matrix, self.optimizer.eligible, unassigned_cost, solution, k=k)
+
+    def _acquire_solver(self, c: int):
+        """Take an idle persistent solver of component `c`, or build another one if all are busy."""
+        with self._lock:
+            if self._idle_solvers[c]:
+                return self._idle_solvers[c].pop()
+        return cp.SolverLookup.get("ortools", self._models[c][0]), weights_key(self.weights)
+
+    def _release_solver(self, c: int, cp_solver, solver_key: tuple) -> None:
+        with self._lock:
+            self._idle_solvers[c].append((cp_solver, solver_key))
+
+    @staticmethod
+    def _set_domain(cp_solver, cpm_vars, lower: int, upper: int) -> None:
+        """Change variable bounds directly in the persistent OR-Tools model."""
+        proto = cp_solver.ort_model.Proto()
+        for cpm_var in cpm_vars:
+            domain = proto.variables[cp_solver.solver_var(cpm_var).Index()].domain
+            domain[0] = lower
+            domain[1] = upper
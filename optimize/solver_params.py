@@ -0,0 +1,170 @@
+import cpmpy as cp
+import numpy as np
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+from optimize.assignment_solver import solve_assignment
+
+# Seconds a solve still gets once its deadline has passed; OR-Tools needs a positive limit
+MIN_TIME_LIMIT = 0.01
+
+
+@dataclass(frozen=True)
+class SolverParams:
+    """Search limits for CP-SAT solves; None keeps the OR-Tools default."""
+
+    # Wall-clock seconds after which the best solution found so far is returned
+    time_limit: float | None = None
+    # Parallel search workers per solve, OR-Tools uses all cores by default
+    num_workers: int | None = None
+    # Stop once (objective - bound) / |objective| is at most this value
+    relative_gap: float | None = None
+
+    def solve_kwargs(self, deadline: float = None) -> Dict:
+        """Keyword arguments for `solve()` of a cpmpy OR-Tools solver.
+
+        `deadline` (a `time.monotonic()` value) caps the time limit to the
+        time that is left, at least `MIN_TIME_LIMIT`.
+        """
+        kwargs = {}
+        if self.time_limit is not None:
+            kwargs["time_limit"] = self.time_limit
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), MIN_TIME_LIMIT)
+            kwargs["time_limit"] = min(kwargs.get("time_limit", remaining), remaining)
+        if self.num_workers is not None:
+            kwargs["num_workers"] = self.num_workers
+        if self.relative_gap is not None:
+            kwargs["relative_gap_limit"] = self.relative_gap
+        return kwargs
+
+    @classmethod
+    def from_env(cls, default: "SolverParams" = None) -> "SolverParams":
+        """Read SOLVER_TIME_LIMIT, SOLVER_NUM_WORKERS and SOLVER_RELATIVE_GAP, falling back to `default`."""
+        default = default or cls()
+        time_limit = os.getenv("SOLVER_TIME_LIMIT")
+        num_workers = os.getenv("SOLVER_NUM_WORKERS")
+        relative_gap = os.getenv("SOLVER_RELATIVE_GAP")
+        return cls(
+            time_limit=float(time_limit) if time_limit else default.time_limit,
+            num_workers=int(num_workers) if num_workers else default.num_workers,
+            relative_gap=float(relative_gap) if relative_gap else default.relative_gap,
+        )
+
+
+# Bound the tail latency of a request; the assignment solver ignores these
+DEFAULT_SOLVER_PARAMS = SolverParams(time_limit=30.0)
+
+
+def solve_status(status: str, objective: int, bound: int) -> Dict:
+    """Describe how good a returned solution is.
+
+    Args:
+        status: Solver exit status, e.g. "OPTIMAL" or "FEASIBLE".
+        objective: Objective value of the returned solution.
+        bound: Best proven lower bound on the objective.
+
+    Returns:
+        A dictionary with the `status`, the `objective_bound`, the relative
+        `optimality_gap` and `proven_optimal`. A solve stopped by the gap limit
+        reports "OPTIMAL" but is only proven optimal if the gap is zero.
+    """
+    gap = max(int(objective) - int(bound), 0) / max(abs(int(objective)), 1)
+    return {
+        "status": status,
+        "objective_bound": int(bound),
+        "optimality_gap": gap,
+        "proven_optimal": status == "OPTIMAL" and gap == 0,
+    }
+
+
+def exact_status(objective: int) -> Dict:
+    """Status of a solution from an exact method such as the linear assignment."""
+    return solve_status("OPTIMAL", objective, objective)
+
+
+def cp_solve_status(cp_solver, offset: int = 0) -> Dict:
+    """Status of the last solve of a cpmpy OR-Tools solver.
+
+    `offset` is added to the objective and the bound, for solutions that are
+    adjusted after the solve.
+    """
+    ort_solver = cp_solver.ort_solver
+    return solve_status(
+        cp_solver.status().exitstatus.name,
+        int(round(ort_solver.objective_value)) + offset,
+        int(round(ort_solver.best_objective_bound)) + offset,
+    )
+
+
+def stopped_without_solution(cp_solver) -> bool:
+    """Whether a limit ended the last solve before any solution was found."""
+    return cp_solver.status().exitstatus.name == "UNKNOWN"
+
+
+def merge_status(statuses: Iterable[Dict], objective: int, bound_offset: int = 0) -> Dict:
+    """Status of a sum of independently solved parts.
+
+    The bound of the sum is the sum of the parts' bounds plus `bound_offset`
+    for the constant part of the objective.
+    """
+    statuses = list(statuses)
+    status = "OPTIMAL" if all(part["status"] == "OPTIMAL" for part in statuses) else "FEASIBLE"
+    bound = bound_offset + sum(part["objective_bound"] for part in statuses)
+    return solve_status(status, objective, bound)
+
+
+def solve_cp(model: cp.Model, params: SolverParams = None):
+    """Solve a model with OR-Tools under the given limits.
+
+    Returns:
+        The cpmpy solver after the solve (values and objective can be read
+        from the model variables) and whether a solution was found.
+    """
+    cp_solver = cp.SolverLookup.get("ortools", model)
+    found = cp_solver.solve(**(params or DEFAULT_SOLVER_PARAMS).solve_kwargs())
+    return cp_solver, found
+
+
+def assignment_result(
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    forced_pair: Tuple[int, int] = None,
+) -> Tuple[List[Tuple[int, int]], int, Dict]:
+    """Exact linear assignment solve as `(pairs, objective, status)`, see `solve_assignment`."""
+    pairs, objective = solve_assignment(cost_matrix, eligible, unassigned_cost, forced_pair=forced_pair)
+    return pairs, objective, exact_status(objective)
+
+
+def cp_result(
+    cp_solver,
+    found: bool,
+    assignments: Dict,
+    cost_matrix: np.ndarray,
+    eligible: np.ndarray,
+    unassigned_cost: int,
+    forced_pair: Tuple[int, int] = None,
+) -> Tuple[List[Tuple[int, int]], int, Dict] | None:
+    """Result of a finished solve of a `build_cp_model` model.
+
+    When a limit stopped the search before any solution was found, the exact
+    linear assignment of the same objective is returned instead, so
+    `cost_matrix`, `eligible`, `unassigned_cost` and `forced_pair` must
+    describe the solved model. Values are read from `cp_solver`, not from the
+    model variables, which may be shared between solvers.
+
+    Returns:
+        A tuple `(pairs, objective, status)` with the assigned (MA index,
+        client index) pairs in row-major order, or None if the model has no
+        solution.
+    """
+    if not found:
+        if stopped_without_solution(cp_solver):
+            return assignment_result(cost_matrix, eligible, unassigned_cost, forced_pair=forced_pair)
+        return None
+    ort_solver = cp_solver.ort_solver
+    pairs = [pair for pair, var in assignments.items() if ort_solver.value(cp_solver.solver_var(var)) == 1]
+    return pairs, int(round(ort_solver.objective_value)), cp_solve_status(cp_solver)
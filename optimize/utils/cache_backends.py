@@ -0,0 +1,253 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+
+class CacheBackend(ABC):
+    """Interface of a key/value store for JSON-serialisable results.
+
+    `get` returns `default` for missing or expired keys; pass a sentinel to
+    tell a miss apart from a stored None. Returned values are shared and
+    must be treated as read-only.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """The value stored for `key`, `default` if it is missing or expired."""
+        entry = self.get_entry(key)
+        return default if entry is None else entry[1]
+
+    @abstractmethod
+    def get_entry(self, key: str) -> Tuple[float, Any] | None:
+        """`(created, value)` stored for `key`, None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, created: float = None) -> None:
+        """Store `value` under `key`, replacing any previous value.
+
+        `created` is the `time.time()` at which the value was first stored,
+        now by default; the time to live counts from it.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove `key`; missing keys are ignored."""
+
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        """Try to become the only process computing `key`; True if acquired.
+
+        Backends that are not shared between processes have nothing to
+        coordinate and always grant the lock.
+        """
+        return True
+
+    def release_lock(self, key: str, owner: str) -> None:
+        pass
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class MemoryLRUCache(CacheBackend):
+    """Bounded in-process LRU cache with an optional time to live."""
+
+    def __init__(self, max_entries: int = 64, ttl: float = None) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: str) -> Tuple[float, Any] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            self._count(entry is not None)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, created: float = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() if created is None else created, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {**super().stats(), "entries": len(self._entries)}
+
+
+class SQLiteCache(CacheBackend):
+    """Compressed results in a single SQLite file that all worker processes share.
+
+    The database runs in WAL mode so readers never block the writer. Entries
+    older than `ttl` seconds are ignored and purged, and once the stored
+    values exceed `max_bytes` the least recently used entries are evicted.
+    """
+
+    # Run the purge every this many writes instead of on every write
+    EVICT_EVERY = 32
+
+    def __init__(self, path: str, ttl: float = None, max_bytes: int = None) -> None:
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def encode(value: Any) -> bytes:
+        return zlib.compress(json.dumps(value).encode())
+
+    @staticmethod
+    def decode(blob: bytes) -> Any:
+        return json.loads(zlib.decompress(blob))
+
+    def get_entry(self, key: str) -> Tuple[float, Any] | None:
+        connection = self._connection()
+        row = connection.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+            self._count(False)
+            return None
+        with connection:
+            connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return row[1], self.decode(row[0])
+
+    def set(self, key: str, value: Any, created: float = None) -> None:
+        blob = self.encode(value)
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now if created is None else created, now),
+            )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        """Take the cross-process lock for `key`; locks of crashed owners expire after `ttl`."""
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("DELETE FROM locks WHERE key = ? AND expires < ?", (key, now))
+            inserted = connection.execute(
+                "INSERT OR IGNORE INTO locks (key, owner, expires) VALUES (?, ?, ?)", (key, owner, now + ttl)
+            ).rowcount
+        return inserted == 1
+
+    def release_lock(self, key: str, owner: str) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, owner))
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones above `max_bytes`."""
+        with self._connection() as connection:
+            if self.ttl is not None:
+                connection.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+            if self.max_bytes is not None:
+                total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                if total > self.max_bytes:
+                    keys = []
+                    for key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                        if total <= self.max_bytes:
+                            break
+                        keys.append((key,))
+                        total -= size
+                    connection.executemany("DELETE FROM entries WHERE key = ?", keys)
+
+    def stats(self) -> Dict[str, int]:
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {**super().stats(), "entries": entries, "bytes": size}
+
+
+class TieredCache(CacheBackend):
+    """A fast front cache backed by a slower, shared one."""
+
+    def __init__(self, front: CacheBackend, back: CacheBackend) -> None:
+        super().__init__()
+        self.front = front
+        self.back = back
+
+    def get_entry(self, key: str) -> Tuple[float, Any] | None:
+        entry = self.front.get_entry(key)
+        if entry is None:
+            entry = self.back.get_entry(key)
+            if entry is not None:
+                # Keep the original creation time so the front copy expires with the stored one
+                self.front.set(key, entry[1], created=entry[0])
+        self._count(entry is not None)
+        return entry
+
+    def set(self, key: str, value: Any, created: float = None) -> None:
+        # Round-trip through JSON so both tiers hand out the same plain data
+        value = json.loads(json.dumps(value))
+        created = time.time() if created is None else created
+        self.back.set(key, value, created=created)
+        self.front.set(key, value, created=created)
+
+    def delete(self, key: str) -> None:
+        self.front.delete(key)
+        self.back.delete(key)
+
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        return self.back.acquire_lock(key, owner, ttl)
+
+    def release_lock(self, key: str, owner: str) -> None:
+        self.back.release_lock(key, owner)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "front": self.front.stats(), "back": self.back.stats()}
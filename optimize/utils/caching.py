@@ -1,32 +1,156 @@
 import hashlib
 import os
 import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, Tuple
+
+from optimize.utils.cache_backends import CacheBackend, MemoryLRUCache, SQLiteCache, TieredCache
 
 CACHE_DIR = "cache"
+# Starts empty on first use; result files of the old JSON cache in CACHE_DIR are not read
+CACHE_DB = os.path.join(CACHE_DIR, "results.sqlite3")
+# Results kept in memory per worker
+MEMORY_CACHE_SIZE = 64
+# Results older than a week are recomputed
+CACHE_TTL = 7 * 24 * 60 * 60
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# A computation that takes longer than this is assumed to have crashed
+COMPUTE_LOCK_TTL = 10 * 60
+# How often requests waiting on another worker look for its result
+COMPUTE_POLL_INTERVAL = 0.2
+# Results that are not final, e.g. cut short by the solver time limit, are shared for this long
+PROVISIONAL_TTL = 2 * 60
+
+_cache: CacheBackend | None = None
+_cache_lock = threading.Lock()
+# Computations running in this process, keyed on the cache key
+_in_flight: Dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+# Returned by `_lookup` for a miss, since None is a valid stored result
+_MISS = object()
+
+
+def canonical_ids(ids: Iterable[str] | None) -> Tuple[str, ...]:
+    """Sorted, de-duplicated IDs; None and an empty list both become ()."""
+    return tuple(sorted(set(ids or [])))
+
+
+def settings_key(**settings) -> str:
+    """Canonical string for a set of settings, independent of argument order.
+
+    Lists, tuples and sets of IDs should be passed through `canonical_ids`
+    first so that equivalent requests produce the same key.
+    """
+    return json.dumps(settings, sort_keys=True, default=str)
+
+
+def get_cache() -> CacheBackend:
+    """Return the process-wide result cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TieredCache(
+                MemoryLRUCache(max_entries=MEMORY_CACHE_SIZE, ttl=CACHE_TTL),
+                SQLiteCache(CACHE_DB, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES),
+            )
+    return _cache
+
+
+def _key(unique_settings: str) -> str:
+    return hashlib.sha256(unique_settings.encode()).hexdigest()
+
+
+def _provisional_key(key: str) -> str:
+    return f"{key}:provisional"
+
+
+def _lookup(cache: CacheBackend, key: str):
+    """The stored result for `key`, or else a provisional one that has not expired yet, `_MISS` if neither."""
+    cached = cache.get(key, _MISS)
+    if cached is not _MISS:
+        return cached
+    provisional = cache.get(_provisional_key(key))
+    if provisional is not None and provisional["expires"] > time.time():
+        return provisional["result"]
+    return _MISS
+
 
 def cache_result(unique_settings: str, result: dict) -> None:
     """Cache the result of the optimization for the given unique settings."""
-    
-    hash_object = hashlib.sha256(unique_settings.encode())
-    hex_dig = hash_object.hexdigest()
-    
-    if not os.path.exists(CACHE_DIR):
-        os.makedirs(CACHE_DIR)
-        
-    with open(os.path.join(CACHE_DIR, f"{hex_dig}.json"), "w") as f:
-        json.dump(result, f)
-        
-        
+    get_cache().set(_key(unique_settings), result)
+
+
 def retrieve_cached_result(unique_settings: str) -> dict | None:
     """Retrieve the cached result for the given unique settings."""
-    
-    hash_object = hashlib.sha256(unique_settings.encode())
-    hex_dig = hash_object.hexdigest()
-    
-    if not os.path.exists(CACHE_DIR):
-        return None
+    return get_cache().get(_key(unique_settings))
+
+
+def compute_once(
+    unique_settings: str,
+    compute: Callable[[], dict | None],
+    cacheable: Callable[[dict | None], bool] = None,
+) -> dict | None:
+    """Return the cached result for the settings, computing it at most once.
+
+    Concurrent calls with the same settings are coalesced: within a process
+    the first caller computes and the others wait on its future, and across
+    worker processes a lock in the cache store makes the other workers wait
+    for the stored result instead of solving the same scenario again.
+    Results for which `cacheable` returns False are not final: they are
+    stored as provisional results that the waiting workers and later calls
+    get for `PROVISIONAL_TTL` seconds, after which the settings are computed
+    again.
+    """
+    key = _key(unique_settings)
+    cached = _lookup(get_cache(), key)
+    if cached is not _MISS:
+        return cached
+
+    with _in_flight_lock:
+        flight = _in_flight.get(key)
+        is_leader = flight is None
+        if is_leader:
+            flight = _in_flight[key] = Future()
+    if not is_leader:
+        return flight.result()
+
+    try:
+        result = _compute_across_workers(key, compute, cacheable)
+        flight.set_result(result)
+        return result
+    except BaseException as e:
+        flight.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+
+def _compute_across_workers(
+    key: str, compute: Callable[[], dict | None], cacheable: Callable[[dict | None], bool] = None
+) -> dict | None:
+    cache = get_cache()
+    owner = f"{os.getpid()}:{threading.get_ident()}"
+    while not cache.acquire_lock(key, owner, COMPUTE_LOCK_TTL):
+        # Another worker is computing the same result
+        time.sleep(COMPUTE_POLL_INTERVAL)
+        cached = _lookup(cache, key)
+        if cached is not _MISS:
+            return cached
+
     try:
-        with open(os.path.join(CACHE_DIR, f"{hex_dig}.json"), "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return None
\ No newline at end of file
+        # The previous lock holder may have stored the result just before releasing
+        cached = _lookup(cache, key)
+        if cached is not _MISS:
+            return cached
+        result = compute()
+        if cacheable is None or cacheable(result):
+            cache.set(key, result)
+        else:
+            cache.set(_provisional_key(key), {"expires": time.time() + PROVISIONAL_TTL, "result": result})
+        return result
+    finally:
+        cache.release_lock(key, owner)
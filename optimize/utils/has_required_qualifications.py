@@ -1,4 +1,3 @@
-from typing import List
-
-def has_required_qualifications(employee_quals: List, client_qual: List) -> bool:
-    return all(x in employee_quals for x in client_qual)
\ No newline at end of file
+def has_required_qualifications(employee_mask: int, client_mask: int) -> bool:
+    """Whether an MA with the qualification bitmask `employee_mask` has every qualification in `client_mask`."""
+    return client_mask & ~employee_mask == 0
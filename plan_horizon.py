@@ -0,0 +1,185 @@
+"""
+Plan several consecutive working days in one call.
+
+Builds one day dataset per working day from a single query of the
+interval-indexed Vertretungen and solves all days with a continuity
+objective that prefers keeping the same MA with the same client (see
+`optimize.horizon.solve_horizon`).
+
+Plan a week:   python plan_horizon.py --start 2025-03-17 --end 2025-03-21
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from get_recommendations import SOLVER_PARAMS, build_day_dataset, format_day_dataset
+from optimize.horizon import DEFAULT_CONTINUITY_WEIGHT, HORIZON_MODES, solve_horizon
+from optimize.optimizer import Optimizer
+from optimize.SoftConstraintHandler import resolve_weights
+from optimize.solver_params import SolverParams
+from optimize.utils.caching import canonical_ids, compute_once, settings_key
+from retrieval_helper.get_vertretungen import build_vertretung_index, get_vertretungen_between
+from retrieval_helper.snapshot_store import snapshot_store
+
+
+def working_days(start: datetime, end: datetime) -> List[datetime]:
+    """Monday to Friday dates from `start` to `end`, both included."""
+    dates = []
+    date = start
+    while date <= end:
+        if date.weekday() < 5:
+            dates.append(date)
+        date += timedelta(days=1)
+    return dates
+
+
+def follows_previous(dates: List[datetime]) -> List[bool]:
+    """Per date, whether it is the first working day after the date before it."""
+    return [
+        d > 0 and working_days(dates[d - 1] + timedelta(days=1), dates[d]) == [dates[d]]
+        for d in range(len(dates))
+    ]
+
+
+def build_horizon(
+    start: datetime,
+    end: datetime,
+    unavailable_clients: List[str] = None,
+    unavailable_mas: List[str] = None,
+    solver: str = "cpsat",
+    solver_params: SolverParams = None,
+    weights: Dict[str, int] = None,
+) -> List[Tuple[datetime, Optimizer]]:
+    """One ready-to-solve optimizer per working day that has MAs and clients to plan.
+
+    The Vertretungen of the whole range are queried once and split per day.
+    """
+    vertretung_index = build_vertretung_index(get_vertretungen_between(start, end))
+    days = []
+    for date in working_days(start, end):
+        dataset = build_day_dataset(date, unavailable_clients, unavailable_mas, vertretungen=vertretung_index.at(date))
+        if dataset.n_mas == 0 or dataset.n_clients == 0:
+            print(f"No MAS or clients available on {date.date().isoformat()}, skipping the day.")
+            continue
+        optimizer = Optimizer(dataset, solver=solver, params=solver_params or SOLVER_PARAMS, weights=weights)
+        optimizer.create_model()
+        days.append((date, optimizer))
+    return days
+
+
+def is_final(output: Dict | None) -> bool:
+    """Whether every day of a horizon payload is proven optimal for the solve that produced it."""
+    if output is None:
+        return True
+    return all(day["assignment_info"]["solver_status"]["proven_optimal"] for day in output["days"])
+
+
+def get_horizon_recommendations(
+    start: datetime,
+    end: datetime,
+    unavailable_clients: List[str] = None,
+    unavailable_mas: List[str] = None,
+    mode: str = "joint",
+    continuity_weight: int = DEFAULT_CONTINUITY_WEIGHT,
+    solver: str = "cpsat",
+    solver_params: SolverParams = None,
+    weights: Dict[str, int] = None,
+) -> Dict | None:
+    """Recommendations for every working day from `start` to `end`.
+
+    Returns:
+        A dictionary with `days`, one payload per planned day in the shape of
+        `get_recommendations()` plus its `date`, the number of `kept`
+        MA/client pairs from one day to the next, the horizon `objective`
+        and its `solver_status`. None if no day has a solution.
+    """
+    if mode not in HORIZON_MODES:
+        raise ValueError(f"Unknown horizon mode '{mode}', expected one of {HORIZON_MODES}")
+    weights = resolve_weights(weights)
+
+    setting_str = settings_key(
+        horizon_start=start.isoformat(),
+        horizon_end=end.isoformat(),
+        mode=mode,
+        continuity_weight=continuity_weight,
+        unavailable_clients=canonical_ids(unavailable_clients),
+        unavailable_mas=canonical_ids(unavailable_mas),
+        solver=solver,
+        data=snapshot_store.fingerprint(),
+        weights=weights,
+    )
+
+    def compute():
+        days = build_horizon(start, end, unavailable_clients, unavailable_mas, solver, solver_params, weights)
+        if not days:
+            return None
+        # Skipped days break the continuity between their neighbours
+        result = solve_horizon(
+            [optimizer for _, optimizer in days],
+            mode=mode,
+            continuity_weight=continuity_weight,
+            follows_previous=follows_previous([date for date, _ in days]),
+        )
+        if result is None:
+            return None
+
+        payloads = []
+        for (date, optimizer), day in zip(days, result["days"]):
+            assignment_info = optimizer.process_results(day["pairs"])
+            assignment_info["solver_status"] = day["status"]
+            mas, clients = format_day_dataset(optimizer.dataset)
+            payloads.append(
+                {"date": date.date().isoformat(), "assignment_info": assignment_info, "mas": mas, "clients": clients}
+            )
+        print(f"Horizon objective: {result['objective']}, kept pairs: {result['kept']}")
+        return {
+            "days": payloads,
+            "kept": result["kept"],
+            "objective": result["objective"],
+            "solver_status": result["status"],
+        }
+
+    return compute_once(setting_str, compute, cacheable=is_final)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Plan several consecutive working days in one call.")
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True, help="First day (YYYY-MM-DD).")
+    parser.add_argument("--end", type=datetime.fromisoformat, required=True, help="Last day (YYYY-MM-DD).")
+    parser.add_argument("--mode", choices=HORIZON_MODES, default="joint", help="How the days are solved.")
+    parser.add_argument(
+        "--continuity-weight",
+        type=int,
+        default=DEFAULT_CONTINUITY_WEIGHT,
+        help="Reward for keeping an MA with the same client on the next day.",
+    )
+    parser.add_argument("--solver", choices=("cpsat", "assignment"), default="cpsat", help="Solver backend.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    started = time.time()
+    output = get_horizon_recommendations(
+        args.start, args.end, mode=args.mode, continuity_weight=args.continuity_weight, solver=args.solver
+    )
+    if output is None:
+        print("No feasible plan found.")
+        return
+    summary = {
+        "objective": output["objective"],
+        "kept": output["kept"],
+        "solver_status": output["solver_status"],
+        "days": {day["date"]: len(day["assignment_info"]["assigned_pairs"]) for day in output["days"]},
+    }
+    print(json.dumps(summary, indent=2))
+    print(f"Planned {len(output['days'])} days in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Pre-compute recommendations for the upcoming planning days.
+
+Warms the result cache with the default scenario (no exclusions, no forced
+pair) for a window of working days and with the forced variants for the
+alternatives shown next to every assignment, so that the first request of the
+day and the first diffs are cache hits. Cache keys include the data
+fingerprint, so the job re-runs whenever the data snapshot changes.
+
+Run once:            python prewarm.py --days 5
+Keep data in sync:   python prewarm.py --watch
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from get_recommendations import DEFAULT_DATE, build_output_index, find_alternatives, get_recommendations
+from retrieval_helper.snapshot_store import snapshot_store
+
+PREWARM_DAYS = 3
+PREWARM_TOP_K = 3
+# Seconds between two checks for changed data files
+PREWARM_INTERVAL = 60
+
+
+def planning_days(start: datetime, days: int) -> List[datetime]:
+    """The next `days` working days, starting with `start` if it is one."""
+    dates = []
+    date = start
+    while len(dates) < days:
+        if date.weekday() < 5:
+            dates.append(date)
+        date += timedelta(days=1)
+    return dates
+
+
+def prewarm(start: datetime = None, days: int = PREWARM_DAYS, top_k: int = PREWARM_TOP_K) -> int:
+    """Compute and cache the default plan and its top-k alternatives per MA.
+
+    Returns:
+        The number of scenarios that were requested.
+    """
+    scenarios = 0
+    for date in planning_days(start or DEFAULT_DATE, days):
+        output = get_recommendations(date=date)
+        scenarios += 1
+        if output is None:
+            continue
+
+        index = build_output_index(output)
+        for assignment in output["assignment_info"]["assigned_pairs"]:
+            raw_ma = index["mas"][assignment["ma"]]
+            alternatives = find_alternatives(output["clients"], raw_ma, assignment["klient"], index=index)
+            for alternative in alternatives[:top_k]:
+                get_recommendations(forced_ma=raw_ma["id"], forced_client=alternative["id"], date=date)
+                scenarios += 1
+        print(f"Pre-warmed recommendations for {date.date().isoformat()}")
+
+    return scenarios
+
+
+def watch(
+    start: datetime = None,
+    days: int = PREWARM_DAYS,
+    top_k: int = PREWARM_TOP_K,
+    interval: float = PREWARM_INTERVAL,
+    stop: threading.Event = None,
+) -> None:
+    """Pre-warm now and again every time the data snapshot changes."""
+    stop = stop or threading.Event()
+    warmed_fingerprint = None
+    while not stop.is_set():
+        fingerprint = snapshot_store.fingerprint()
+        if fingerprint != warmed_fingerprint:
+            try:
+                prewarm(start, days, top_k)
+                warmed_fingerprint = fingerprint
+            except Exception as e:
+                print(f"Pre-warming failed: {e}")
+        stop.wait(interval)
+
+
+def start_background_prewarm(**kwargs) -> threading.Thread:
+    """Run `watch` in a daemon thread, e.g. next to the API."""
+    thread = threading.Thread(target=watch, kwargs=kwargs, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Pre-compute recommendations for the upcoming planning days."
+    )
+    parser.add_argument(
+        "--start",
+        type=datetime.fromisoformat,
+        default=None,
+        help="First planning day (YYYY-MM-DD), defaults to the API's planning date.",
+    )
+    parser.add_argument("--days", type=int, default=PREWARM_DAYS, help="Number of working days.")
+    parser.add_argument(
+        "--top-k", type=int, default=PREWARM_TOP_K, help="Alternatives per MA to pre-compute."
+    )
+    parser.add_argument(
+        "--watch", action="store_true", help="Keep running and re-run when the data changes."
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.watch:
+        watch(args.start, args.days, args.top_k)
+    else:
+        started = time.time()
+        scenarios = prewarm(args.start, args.days, args.top_k)
+        print(f"Pre-warmed {scenarios} scenarios in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
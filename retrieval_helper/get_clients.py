@@ -1,10 +1,10 @@
 from typing import List, Any
-from retrieval_helper.read_file import read_file
+from retrieval_helper.snapshot_store import snapshot_store
 
 def get_clients() -> List[Any]:
     
     endpoint_key = 'klient'
     
-    clients = read_file(endpoint_key)
+    clients = snapshot_store.get(endpoint_key)
     
     return clients
\ No newline at end of file
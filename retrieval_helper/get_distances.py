@@ -1,10 +1,19 @@
-from typing import List, Any
-from retrieval_helper.read_file import read_file
+from typing import List, Any, Dict
+from retrieval_helper.snapshot_store import snapshot_store
+from feature_retrieval.ma_features import build_distance_index
 
 def get_distances() -> List[Any]:
     
     endpoint_key = 'dist_ma_sch'
     
-    distances = read_file(endpoint_key)
+    distances = snapshot_store.get(endpoint_key)
     
-    return distances
\ No newline at end of file
+    return distances
+
+def get_distance_index() -> Dict[str, Dict[str, int]]:
+    
+    endpoint_key = 'dist_ma_sch'
+    
+    distance_index = snapshot_store.get_index(endpoint_key, build_distance_index)
+    
+    return distance_index
\ No newline at end of file
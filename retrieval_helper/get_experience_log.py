@@ -1,7 +1,14 @@
-from retrieval_helper.read_file import read_file
+from retrieval_helper.snapshot_store import snapshot_store
+from feature_retrieval.ma_features import build_experience_index
 
 def get_experience_log():
     
-    experience = read_file("experience_log")
+    experience = snapshot_store.get("experience_log")
     
-    return experience
\ No newline at end of file
+    return experience
+
+def get_experience_index():
+    
+    experience_index = snapshot_store.get_index("experience_log", build_experience_index)
+    
+    return experience_index
\ No newline at end of file
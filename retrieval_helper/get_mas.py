@@ -1,10 +1,10 @@
 from typing import List, Any
-from retrieval_helper.read_file import read_file
+from retrieval_helper.snapshot_store import snapshot_store
 
 def get_mas() -> List[Any]:
     
     endpoint_key = 'ma'
     
-    mas = read_file(endpoint_key)
+    mas = snapshot_store.get(endpoint_key)
     
     return mas
\ No newline at end of file
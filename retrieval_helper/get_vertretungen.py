@@ -1,13 +1,36 @@
 from typing import List, Any
-from retrieval_helper.read_file import read_file
+from retrieval_helper.snapshot_store import snapshot_store
+from retrieval_helper.interval_index import IntervalIndex
 from datetime import datetime
 
+endpoint_key = 'vertretungsfall_all'
+
+def build_vertretung_index(vertretungen: List[Any]) -> IntervalIndex:
+    """Parse start and end dates once and index the records by their date interval."""
+    
+    intervals = [
+        (
+            datetime.strptime(vertretung["startdatum"], "%Y-%m-%d"),
+            datetime.strptime(vertretung["enddatum"], "%Y-%m-%d"),
+            vertretung,
+        )
+        for vertretung in vertretungen or []
+    ]
+    
+    return IntervalIndex(intervals)
+
 def get_vertretungen(date: datetime) -> List[Any]:
     
-    endpoint_key = 'vertretungsfall_all'
+    vertretung_index = snapshot_store.get_index(endpoint_key, build_vertretung_index)
+    
+    sub_vertretungen = vertretung_index.at(date)
+    
+    return sub_vertretungen
+
+def get_vertretungen_between(start: datetime, end: datetime) -> List[Any]:
     
-    vertretungen = read_file(endpoint_key)
+    vertretung_index = snapshot_store.get_index(endpoint_key, build_vertretung_index)
     
-    sub_vertretungen = [vertretung for vertretung in vertretungen if datetime.strptime(vertretung["startdatum"], "%Y-%m-%d") <= date and datetime.strptime(vertretung["enddatum"], "%Y-%m-%d") >= date]
+    sub_vertretungen = vertretung_index.between(start, end)
     
-    return sub_vertretungen
\ No newline at end of file
+    return sub_vertretungen
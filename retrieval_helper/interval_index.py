@@ -0,0 +1,84 @@
+from bisect import bisect_right
+from typing import Any, List, Sequence, Tuple
+
+# (start, end, position, item); start and end are inclusive
+Interval = Tuple[Any, Any, int, Any]
+
+
+class _Node:
+    __slots__ = ("center", "by_start", "starts", "by_end", "left", "right")
+
+    def __init__(self, intervals: List[Interval]) -> None:
+        endpoints = sorted([interval[0] for interval in intervals] + [interval[1] for interval in intervals])
+        self.center = endpoints[len(endpoints) // 2]
+
+        overlapping, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                overlapping.append(interval)
+
+        # Intervals containing the center, sorted once by start ascending and by end descending
+        self.by_start = sorted(overlapping, key=lambda interval: interval[0])
+        self.starts = [interval[0] for interval in self.by_start]
+        self.by_end = sorted(overlapping, key=lambda interval: interval[1], reverse=True)
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+
+class IntervalIndex:
+    """Centered interval tree answering overlap queries in O(log n + k).
+
+    Results are returned in the order the items were passed in, so callers see
+    the same ordering as a linear filter over the original list.
+    """
+
+    def __init__(self, intervals: Sequence[Tuple[Any, Any, Any]]) -> None:
+        # Inverted intervals can never overlap anything and would break the median split
+        entries = [
+            (start, end, position, item)
+            for position, (start, end, item) in enumerate(intervals)
+            if start <= end
+        ]
+        self._root = _Node(entries) if entries else None
+        self._size = len(entries)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def at(self, point: Any) -> List[Any]:
+        """Return all items whose interval contains `point`."""
+        return self.between(point, point)
+
+    def between(self, low: Any, high: Any) -> List[Any]:
+        """Return all items whose interval overlaps `[low, high]`."""
+        found: List[Interval] = []
+        node = self._root
+        stack = [node] if node is not None else []
+        while stack:
+            node = stack.pop()
+            if high < node.center:
+                # Only intervals starting at or before `high` can overlap
+                found.extend(node.by_start[: bisect_right(node.starts, high)])
+                if node.left is not None:
+                    stack.append(node.left)
+            elif low > node.center:
+                # Only intervals ending at or after `low` can overlap
+                for interval in node.by_end:
+                    if interval[1] < low:
+                        break
+                    found.append(interval)
+                if node.right is not None:
+                    stack.append(node.right)
+            else:
+                found.extend(node.by_start)
+                if node.left is not None:
+                    stack.append(node.left)
+                if node.right is not None:
+                    stack.append(node.right)
+
+        found.sort(key=lambda interval: interval[2])
+        return [interval[3] for interval in found]
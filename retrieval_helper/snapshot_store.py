@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+DATA_DIR = "data"
+
+# Datasets every recommendation request needs
+DATASETS = ("dist_ma_sch", "klient", "ma", "experience_log", "vertretungsfall_all")
+
+
+def freeze(value: Any) -> Any:
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    name: str
+    data: Any
+    version: int
+    mtime: float | None
+    content_hash: str | None
+
+
+class SnapshotStore:
+    """Process-wide store that parses each data file once and shares immutable views.
+
+    A file is only re-read when its mtime changes, and only re-parsed when its
+    content hash changes as well. Reloads build a complete new snapshot before
+    swapping it in, so readers never observe a half-loaded dataset.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, check_interval: float = 1.0) -> None:
+        self.data_dir = data_dir
+        self.check_interval = check_interval
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._last_checked: Dict[str, float] = {}
+        self._indexes: Dict[Tuple[str, Callable], Tuple[int, Any]] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """Counter that is incremented every time any dataset is (re)loaded."""
+        return self._version
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.data_dir, f"{name}.json")
+
+    def get(self, name: str) -> Any:
+        """Return the frozen contents of `data/{name}.json` or None if it is missing."""
+        return self.get_snapshot(name).data
+
+    def get_snapshot(self, name: str) -> Snapshot:
+        snapshot = self._snapshots.get(name)
+        now = time.monotonic()
+        if snapshot is not None and now - self._last_checked.get(name, 0) < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+            self._last_checked[name] = now
+            try:
+                mtime = os.stat(self._path(name)).st_mtime
+            except (PermissionError, FileNotFoundError):
+                mtime = None
+
+            if snapshot is not None and snapshot.mtime == mtime:
+                return snapshot
+
+            return self._reload(name, mtime, snapshot)
+
+    def _reload(self, name: str, mtime: float | None, current: Snapshot | None) -> Snapshot:
+        try:
+            with open(self._path(name), "rb") as openfile:
+                raw = openfile.read()
+        except (PermissionError, FileNotFoundError):
+            raw = None
+
+        content_hash = hashlib.sha256(raw).hexdigest() if raw is not None else None
+
+        if current is not None and current.content_hash == content_hash:
+            # Touched but unchanged: keep the parsed data and version
+            snapshot = Snapshot(name, current.data, current.version, mtime, content_hash)
+        else:
+            data = freeze(json.loads(raw)) if raw is not None else None
+            self._version += 1
+            snapshot = Snapshot(name, data, self._version, mtime, content_hash)
+            print(f"Loaded snapshot {name} (version {snapshot.version})")
+
+        self._snapshots[name] = snapshot
+        return snapshot
+
+    def get_index(self, name: str, builder: Callable[[Any], Any]) -> Any:
+        """Return `builder(data)` for the current snapshot, built once per snapshot version."""
+        snapshot = self.get_snapshot(name)
+        key = (name, builder)
+        cached = self._indexes.get(key)
+        if cached is not None and cached[0] == snapshot.version:
+            return cached[1]
+
+        index = builder(snapshot.data)
+        self._indexes[key] = (snapshot.version, index)
+        return index
+
+    def fingerprint(self, names: Iterable[str] = DATASETS) -> str:
+        """Hash over the content of the given datasets, e.g. for cache keys."""
+        digest = hashlib.sha256()
+        for name in names:
+            digest.update(f"{name}:{self.get_snapshot(name).content_hash}\n".encode())
+        return digest.hexdigest()
+
+    def preload(self, names: Iterable[str] = DATASETS) -> None:
+        """Parse the given datasets eagerly, e.g. at worker start."""
+        for name in names:
+            self.get_snapshot(name)
+
+
+snapshot_store = SnapshotStore()
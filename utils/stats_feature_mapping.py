@@ -5,4 +5,14 @@ feature_mapping_dr = {
     "priority": "Klienten-Priorität",
     "availability_gap": "Mitarbeiterverfügbarkeit in Tagen",
     "ma_availability": "Mitarbeiter muss früher gehen als der Klient",
+}
+
+objective_mapping_dr = {
+    "unassigned": "Nicht zugewiesene Klienten",
+    "travel_time": "Fahrtzeit",
+    "time_window": "Zeitfenster",
+    "priority": "Klienten-Priorität",
+    "client_experience": "Erfahrung mit dem Klienten",
+    "school_experience": "Erfahrung mit der Schule",
+    "availability_gap": "Mitarbeiterverfügbarkeit",
 }
\ No newline at end of file